@@ -0,0 +1,236 @@
+"""
+Benchmark the ingestion path (tokenizing, parsing, storing, and writing/reading the library) over the test files and
+over larger files generated from them.
+Results (records/s, MB/s and peak memory) can be saved, and compared to a baseline to catch regressions.
+"""
+
+import argparse
+import io
+import json
+import pathlib
+import re
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple, Type, Any
+
+import h5py
+
+from cp2k_basis import __version__
+from cp2k_basis.base_objects import FilterUnique, FilterFirst, Storage
+from cp2k_basis.basis_set import AtomicBasisSetsParser, BasisSetsStorage
+from cp2k_basis.parser import BaseParser, index_records
+from cp2k_basis.pseudopotential import AtomicPseudopotentialsParser, PseudopotentialsStorage
+
+TESTS_DIR = pathlib.Path(__file__).parent.parent / 'tests'
+
+FIXTURES = {
+    'BASIS_EXAMPLE': (AtomicBasisSetsParser, BasisSetsStorage),
+    'POTENTIALS_EXAMPLE': (AtomicPseudopotentialsParser, PseudopotentialsStorage),
+    'POTENTIAL_MULTI_VARIANT': (AtomicPseudopotentialsParser, PseudopotentialsStorage),
+}
+
+BENCHMARKS = ['tokenize', 'parse', 'update', 'dump_hdf5', 'read_hdf5']
+
+FILTER_NAME = FilterUnique([(re.compile(r'^(.*)(-q\d{1,2})$'), '\\1'), (re.compile(r'^(.*)$'), '\\1')])
+FILTER_VARIANT = FilterFirst([(re.compile(r'^.*-(q\d{1,2})$'), '\\1')])
+
+# metrics that are compared to the baseline, with the absolute difference under which a change is considered as noise
+METRICS_TO_COMPARE = {
+    'time': 2e-3,
+    'peak_memory': 2 ** 16
+}
+
+
+def scale_content(content: str, scale: int) -> str:
+    """Concatenate `scale` copies of `content`.
+    In copy `i > 0`, each name of each record is prefixed with `R{i}-`, so that they define new families.
+    """
+
+    if not content.endswith('\n'):
+        content += '\n'
+
+    records = index_records(content)
+    copies = [content]
+
+    for i in range(1, scale):
+        pieces = []
+        previous = 0
+
+        for position, _ in records:
+            end = content.find('\n', position)
+            words = content[position:end].split()
+            names = []
+
+            for word in words[1:]:
+                if word[0] == '#':
+                    break
+                names.append('R{}-{}'.format(i, word))
+
+            pieces.append(content[previous:position])
+            pieces.append(' '.join([words[0]] + names))
+            previous = end
+
+        pieces.append(content[previous:])
+        copies.append(''.join(pieces))
+
+    return ''.join(copies)
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> Tuple[float, int]:
+    """Return the best time (in seconds) out of `repeat` calls to `func`, and the peak memory (in bytes) allocated
+    during an extra call (traced separately, since tracing slows down the execution)
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def _dump(storage: Storage) -> bytes:
+    out = io.BytesIO()
+    with h5py.File(out, 'w') as f:
+        storage.dump_hdf5(f)
+
+    return out.getvalue()
+
+
+def _read(storage_type: type, content: bytes) -> Storage:
+    with h5py.File(io.BytesIO(content), 'r') as f:
+        return storage_type.read_hdf5(f)
+
+
+def run_benchmarks(
+        fixtures: List[str] = None,
+        scales: List[int] = (1, 10, 100),
+        benchmarks: List[str] = None,
+        repeat: int = 3,
+        out=sys.stdout
+) -> Dict[str, Dict[str, float]]:
+    """Run `benchmarks` over `fixtures`, scaled by each of `scales`.
+    Return a dictionary of results, whose keys are `benchmark:fixture:xscale`.
+    """
+
+    fixtures = fixtures or list(FIXTURES.keys())
+    benchmarks = benchmarks or BENCHMARKS
+    results = {}
+
+    for fixture in fixtures:
+        parser_type, storage_type = FIXTURES[fixture]
+        base_content = (TESTS_DIR / fixture).read_text()
+
+        for scale in scales:
+            content = scale_content(base_content, scale)
+            objects = list(parser_type(content).iter_data_objects())
+            storage = storage_type()
+            storage.update(objects, FILTER_NAME, FILTER_VARIANT)
+            hdf5_content = _dump(storage)
+
+            text_size = len(content.encode('utf8'))
+            cases = {
+                'tokenize': (lambda: _tokenize(parser_type, content), text_size),
+                'parse': (lambda: list(parser_type(content).iter_data_objects()), text_size),
+                'update': (lambda: storage_type().update(objects, FILTER_NAME, FILTER_VARIANT), text_size),
+                'dump_hdf5': (lambda: _dump(storage), len(hdf5_content)),
+                'read_hdf5': (lambda: _read(storage_type, hdf5_content), len(hdf5_content)),
+            }
+
+            for benchmark in benchmarks:
+                func, size = cases[benchmark]
+                elapsed, peak = measure(func, repeat)
+
+                key = '{}:{}:x{}'.format(benchmark, fixture, scale)
+                results[key] = {
+                    'time': elapsed,
+                    'records': len(objects),
+                    'bytes': size,
+                    'records_per_s': len(objects) / elapsed,
+                    'mb_per_s': size / elapsed / 1e6,
+                    'peak_memory': peak
+                }
+
+                if out is not None:
+                    print('{:<45} {:>10.4f} s {:>12.0f} rec/s {:>9.2f} MB/s {:>10.2f} MiB peak'.format(
+                        key, elapsed, results[key]['records_per_s'], results[key]['mb_per_s'], peak / 2 ** 20
+                    ), file=out)
+
+    return results
+
+
+def _tokenize(parser_type: Type[BaseParser], content: str) -> int:
+    return sum(1 for _ in parser_type.lexer_type(content).tokenize())
+
+
+def compare(
+        results: Dict[str, Dict[str, float]],
+        baseline: Dict[str, Dict[str, float]],
+        tolerance: float = .25
+) -> List[Tuple[str, str, float, float]]:
+    """Compare `results` to `baseline`, and return a list of `(key, metric, baseline value, value)` for each
+    metric (time or peak memory) which is more than `tolerance` (relative) higher than in the baseline.
+    Changes smaller than the noise level given in `METRICS_TO_COMPARE` and keys that are missing in one of the two are
+    ignored.
+    """
+
+    regressions = []
+
+    for key, values in results.items():
+        if key not in baseline:
+            continue
+
+        for metric, noise in METRICS_TO_COMPARE.items():
+            previous = baseline[key][metric]
+            if values[metric] > previous * (1 + tolerance) and values[metric] - previous > noise:
+                regressions.append((key, metric, previous, values[metric]))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+
+    parser.add_argument('-s', '--scales', nargs='+', type=int, default=[1, 10, 100], help='sizes of the inputs')
+    parser.add_argument('-f', '--fixtures', nargs='+', choices=list(FIXTURES.keys()))
+    parser.add_argument('-b', '--benchmarks', nargs='+', choices=BENCHMARKS)
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of timed runs (the best is kept)')
+    parser.add_argument('-o', '--output', type=pathlib.Path, help='save the results (e.g., as a new baseline)')
+    parser.add_argument('-c', '--compare', type=pathlib.Path, help='compare to a baseline')
+    parser.add_argument('-t', '--tolerance', type=float, default=.25, help='relative tolerance for the comparison')
+
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.fixtures, args.scales, args.benchmarks, args.repeat)
+
+    if args.output:
+        with args.output.open('w') as f:
+            json.dump({'version': __version__, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with args.compare.open() as f:
+            baseline = json.load(f)['results']
+
+        regressions = compare(results, baseline, args.tolerance)
+
+        for key, metric, previous, current in regressions:
+            print('REGRESSION {} ({}): {:.4g} -> {:.4g} ({:+.0%})'.format(
+                key, metric, previous, current, current / previous - 1))
+
+        if regressions:
+            sys.exit(1)
+
+        print('no regression (tolerance: {:.0%})'.format(args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark the rendering of the families of a library in the CP2K format (i.e., what the webservice does for each
+uncached request), with `cp2k_basis.render` against the reference (previous) implementation of `__str__()`.
+Both outputs are checked to be identical.
+"""
+
+import argparse
+import pathlib
+import sys
+from typing import Dict, List
+
+import h5py
+
+from cp2k_basis.base_objects import BaseAtomicVariantDataObject, Storage
+from cp2k_basis.basis_set import BasisSetsStorage, Contraction, AtomicBasisSetVariant
+from cp2k_basis.elements import L_TO_SHELL, SYMB_TO_Z
+from cp2k_basis.pseudopotential import PseudopotentialsStorage, NonLocalProjector, AtomicPseudopotentialVariant
+
+from benchmarks.ingestion import TESTS_DIR, measure
+
+LIBRARY = TESTS_DIR / 'LIBRARY_EXAMPLE.h5'
+
+
+def reference_contraction(contraction: Contraction) -> str:
+    r = '{} {} {} {} {}\n'.format(
+        contraction.principle_n,
+        contraction.l_min,
+        contraction.l_max,
+        contraction.nfunc,
+        ' '.join(str(x) for x in contraction.nshell))
+
+    fmt = '{:>16.12f}' + ' {: .12f}' * sum(contraction.nshell) + '\n'
+    for i in range(contraction.nfunc):
+        r += fmt.format(contraction.exponents[i], *contraction.coefficients[i])
+
+    return r
+
+
+def reference_nonlocal_projector(projector: NonLocalProjector) -> str:
+    r = '{:16.8f} {:>3}'.format(projector.radius, projector.nfunc)
+
+    for i in range(projector.nfunc):
+        if i != 0:  # pad
+            r += '                    ' + ' ' * 15 * i
+        r += (' {:14.8f}' * (projector.nfunc - i)).format(*projector.coefficients[i, i:]) + '\n'
+
+    if projector.nfunc == 0:
+        r += '\n'
+
+    return r
+
+
+def reference(variant: BaseAtomicVariantDataObject) -> str:
+    """Previous implementation of `str(variant)`"""
+
+    if isinstance(variant, AtomicBasisSetVariant):
+        r = '# {} [{}|{}]\n'.format(
+            variant.symbol, variant._representation(False, sep=''), variant._representation(True, sep=''))
+
+        if variant.source:
+            r += '# SOURCE: {}\n'.format(variant.source)
+
+        r += '{}  {}\n{}\n'.format(variant.symbol, ' '.join(variant.names), len(variant.contractions))
+        r += ''.join(reference_contraction(c) for c in variant.contractions)
+
+        return r
+
+    elif isinstance(variant, AtomicPseudopotentialVariant):
+        r = '# {} [{}|{}]\n'.format(
+            variant.symbol,
+            SYMB_TO_Z[variant.symbol] - sum(variant.nelec),
+            ''.join('{}{}'.format(variant.nelec[i], L_TO_SHELL[i]) if variant.nelec[i] != 0 else ''
+                    for i in range(len(variant.nelec)))
+        )
+
+        if variant.source:
+            r += '# SOURCE: {}\n'.format(variant.source)
+
+        r += '{}  {}\n{}\n'.format(
+            variant.symbol, ' '.join(variant.names), ' '.join('{}'.format(x) for x in variant.nelec))
+
+        n = variant.lcoefficients.shape[0]
+        r += '{:16.8f} {:>3}'.format(variant.lradius, n)
+        r += (' {:14.8f}' * n).format(*variant.lcoefficients) + '\n'
+
+        r += '  {:>4}\n'.format(len(variant.nlprojectors))
+
+        for proj in variant.nlprojectors:
+            r += reference_nonlocal_projector(proj)
+
+        return r
+
+    raise TypeError('cannot render {}'.format(type(variant)))
+
+
+def read_storages(path: pathlib.Path = LIBRARY) -> Dict[str, Storage]:
+    with h5py.File(path, 'r') as f:
+        return {
+            'basis_sets': BasisSetsStorage.read_hdf5(f),
+            'pseudopotentials': PseudopotentialsStorage.read_hdf5(f)
+        }
+
+
+def mismatches(storages: Dict[str, Storage]) -> List[str]:
+    """List the variants for which the output of `str()` differs from the reference"""
+
+    different = []
+
+    for storage in storages.values():
+        for family in storage:
+            for atomic_data_object in storage[family].values():
+                for variant in atomic_data_object:
+                    if str(atomic_data_object[variant]) != reference(atomic_data_object[variant]):
+                        different.append('{}:{}:{}'.format(family, atomic_data_object.symbol, variant))
+
+    return different
+
+
+def run_benchmarks(
+        path: pathlib.Path = LIBRARY, scale: int = 1, repeat: int = 3, out=sys.stdout
+) -> Dict[str, Dict[str, float]]:
+    """Render each family of the library (`scale` times), with the reference and the current implementation.
+    Return a dictionary of results, whose keys are `type:family`.
+    """
+
+    storages = read_storages(path)
+    results = {}
+
+    for storage_type, storage in storages.items():
+        for family in storage:
+            variants = [obj[v] for obj in storage[family].values() for v in obj] * scale
+
+            reference_time, _ = measure(lambda: ''.join(reference(v) for v in variants), repeat)
+            time, _ = measure(lambda: ''.join(str(v) for v in variants), repeat)
+
+            key = '{}:{}'.format(storage_type, family)
+            results[key] = {
+                'variants': len(variants),
+                'reference_time': reference_time,
+                'time': time,
+                'speedup': reference_time / time
+            }
+
+            if out is not None:
+                print('{:<45} {:>6} variants {:>10.2f} ms (was {:>8.2f} ms) x{:.2f}'.format(
+                    key, len(variants), time * 1e3, reference_time * 1e3, results[key]['speedup']), file=out)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+
+    parser.add_argument('-l', '--library', type=pathlib.Path, default=LIBRARY, help='library file')
+    parser.add_argument('-s', '--scale', type=int, default=1, help='render each family `scale` times')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='number of timed runs (the best is kept)')
+
+    args = parser.parse_args()
+
+    different = mismatches(read_storages(args.library))
+    if different:
+        print('MISMATCH {}'.format(', '.join(different)))
+        sys.exit(1)
+
+    run_benchmarks(args.library, args.scale, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
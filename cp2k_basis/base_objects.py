@@ -1,5 +1,9 @@
+import functools
+import json
 import re
 import sys
+import threading
+import weakref
 
 import h5py
 
@@ -9,20 +13,84 @@ import more_itertools
 import numpy
 
 from cp2k_basis import logger
+from cp2k_basis.cache import LRUCache
 from cp2k_basis.elements import ElementSet, SYMB_TO_Z
+from cp2k_basis.index import FamiliesIndex
 
 string_dt = h5py.special_dtype(vlen=str)
 
+# version of the layout of the library file written by `Storage.dump_hdf5()`
+HDF5_FORMAT_VERSION = 2
+
 
 l_logger = logger.getChild('base_objects')
 
 
 class BaseAtomicVariantDataObject:
+
+    # attributes which are only set when first accessed, for objects created with `lazy()`
+    lazy_attributes: Tuple[str, ...] = ()
+
+    # if set (e.g., read from a library file), the output of `str()`, which is then not rendered
+    text: str = None
+
     def __init__(self, symbol: str, names: List[str], source: str = ''):
         self.symbol = symbol
         self.names = names
         self.source = source
 
+    @classmethod
+    def lazy(
+        cls,
+        symbol: str,
+        names: List[str],
+        loader: Callable[[], 'BaseAtomicVariantDataObject'],
+        source: str = '',
+        **kwargs
+    ) -> 'BaseAtomicVariantDataObject':
+        """Create an object for which the attributes in `lazy_attributes` are taken from the object returned by
+        `loader`, which is only called when one of them is first accessed. Other attributes are given in `kwargs`.
+        """
+
+        obj = cls.__new__(cls)
+        BaseAtomicVariantDataObject.__init__(obj, symbol, names, source)
+        obj.__dict__.update(**kwargs)
+        obj._loader = loader
+
+        return obj
+
+    @classmethod
+    def lazy_unpack(
+        cls,
+        symbol: str,
+        names: List[str],
+        ints: numpy.ndarray,
+        loader: Callable[[], 'BaseAtomicVariantDataObject'],
+        source: str = '',
+        **kwargs
+    ) -> 'BaseAtomicVariantDataObject':
+        """Create with `lazy()`, where the attributes that are not lazy are taken from `ints` (the integers given by
+        `pack()`), so that only `loader` needs the floats.
+        """
+
+        return cls.lazy(symbol, names, loader, source, **kwargs)
+
+    def __getattr__(self, item: str) -> Any:
+        # only called when `item` is not found, e.g., for lazy attributes that are not loaded yet
+        loader = self.__dict__.get('_loader', None)
+        if loader is None or item not in self.lazy_attributes:
+            raise AttributeError('`{}` object has no attribute `{}`'.format(type(self).__name__, item))
+
+        l_logger.debug('load lazy attributes of {}'.format(repr(self)))
+
+        obj = loader()
+        for attribute in self.lazy_attributes:
+            setattr(self, attribute, getattr(obj, attribute))
+
+        self._loader = None
+
+        return getattr(self, item)
+
     def preferred_name(self, family_name: str, variant: str) -> str:
         """Select one of the `self.names`, hopefully containing the family name and the variant.
         If not, try to select one that contains the variant, and if not the family name, and if not,
@@ -70,6 +138,35 @@ class BaseAtomicVariantDataObject:
 
         raise NotImplementedError()
 
+    def pack(self) -> Tuple[List[int], numpy.ndarray]:
+        """Pack the data (except the symbol, names and source) into a list of integers and an array of floats,
+        as stored in the version 2 of the library file format.
+        """
+
+        raise NotImplementedError()
+
+    @classmethod
+    def unpack(
+        cls, symbol: str, names: List[str], ints: numpy.ndarray, floats: numpy.ndarray, source: str = ''
+    ) -> 'BaseAtomicVariantDataObject':
+        """Create from the output of `pack()`"""
+
+        raise NotImplementedError()
+
+    def estimated_size(self) -> int:
+        """Rough estimate of the memory taken by the data of the variant (in bytes), based on `pack()` (if they are
+        loaded) and the text.
+        The overhead of python objects is not taken into account.
+        """
+
+        size = sum(len(name) for name in self.names) + len(self.source) + (len(self.text) if self.text else 0)
+
+        if self.__dict__.get('_loader', None) is None:
+            ints, floats = self.pack()
+            size += 8 * len(ints) + floats.nbytes
+
+        return size
+
 
 class BaseAtomicDataObject:
     """Base atomic data object, stores `BaseAtomicVariantDataObject`
@@ -140,11 +237,106 @@ class BaseFamilyStorage:
 
     def __init__(self, family_name: str, metadata: Dict[str, Union[str, Any]] = None):
         self.name = family_name
-        self.data_objects: Dict[str, BaseAtomicDataObject] = {}
         self.metadata = metadata if metadata else {}
 
+        self._data_objects: Dict[str, BaseAtomicDataObject] = {}
+        self._loader: Callable[[], Iterable[Tuple[BaseAtomicVariantDataObject, str]]] = None
+        self._reloader: Callable[[], Iterable[Tuple[BaseAtomicVariantDataObject, str]]] = None
+
+        # prevents two threads to load this family (loading other families is not blocked)
+        self._load_lock = threading.Lock()
+
+        # if set (e.g., read from a library file), the preferred name of each `(symbol, variant)`
+        self.preferred_names: Dict[Tuple[str, str], str] = None
+
+        # if set (e.g., from the sizes of the rows of a library file, or once computed), see `estimated_size()`
+        self.size_hint: int = None
+
+    @classmethod
+    def lazy(
+        cls,
+        family_name: str,
+        loader: Callable[[], Iterable[Tuple[BaseAtomicVariantDataObject, str]]],
+        metadata: Dict[str, Union[str, Any]] = None
+    ) -> 'BaseFamilyStorage':
+        """Create a family for which the variants are given by `loader`, which is only called when they are first
+        accessed (and again after `unload()`).
+        """
+
+        obj = cls(family_name, metadata)
+        obj._loader = loader
+        obj._reloader = loader
+
+        return obj
+
+    @property
+    def data_objects(self) -> Dict[str, BaseAtomicDataObject]:
+        if self._loader is not None:
+            with self._load_lock:
+                if self._loader is not None:
+                    l_logger.debug('load variants of {}'.format(repr(self)))
+
+                    data_objects = {}
+                    for obj, variant in self._loader():
+                        if obj.symbol not in data_objects:
+                            data_objects[obj.symbol] = self.object_type(self.name, obj.symbol)
+
+                        data_objects[obj.symbol].add(obj, variant)
+
+                    self._data_objects = data_objects
+                    self._loader = None
+
+        return self._data_objects
+
+    def is_loaded(self) -> bool:
+        return self._loader is None
+
+    def unload(self) -> bool:
+        """Drop the variants, which are loaded again on next access.
+        Only possible for families created with `lazy()` that were not modified since then, otherwise `False` is
+        returned.
+        """
+
+        with self._load_lock:
+            if self._reloader is None:
+                return False
+
+            l_logger.debug('unload variants of {}'.format(repr(self)))
+
+            # replace rather than clear, in case the variants are still in use somewhere else
+            self._data_objects = {}
+            self._loader = self._reloader
+
+            return True
+
+    def estimated_size(self) -> int:
+        """Rough estimate of the memory taken by the variants (in bytes), see
+        `BaseAtomicVariantDataObject.estimated_size()`.
+        It is only computed (which requires the variants to be loaded) if not given by `size_hint`, then kept.
+        """
+
+        if self.size_hint is None:
+            self.size_hint = sum(
+                obj.estimated_size() for atomic in self.data_objects.values() for obj in atomic.values())
+
+        return self.size_hint
+
+    def preferred_name(self, symbol: str, variant: str) -> str:
+        """Name to use for `variant` of `symbol` in this family (see `BaseAtomicVariantDataObject.preferred_name()`)
+        """
+
+        if self.preferred_names is not None:
+            return self.preferred_names[symbol, variant]
+
+        return self[symbol][variant].preferred_name(self.name, variant)
+
     def add(self, obj: BaseAtomicVariantDataObject, variant: str):
 
+        # the family is now different from what the loader gives
+        self._reloader = None
+        self.preferred_names = None
+        self.size_hint = None
+
         if obj.symbol not in self.data_objects:
             self.data_objects[obj.symbol] = self.object_type(self.name, obj.symbol)
 
@@ -234,9 +426,19 @@ class Storage:
     def __init__(self):
         self.families: Dict[str, BaseFamilyStorage] = {}
         self.tags_per_family: Dict[str, List[str]] = {}
-        self.elements_per_family: Dict[str, List[str]] = {}
         self.date_build = None
 
+        # elements of each family, as a bitmask (so that filtering on elements is a single operation per family),
+        # and as a list of unique symbols, sorted by Z (kept in sync with the former)
+        self.element_sets_per_family: Dict[str, ElementSet] = {}
+        self.elements_per_family: Dict[str, List[str]] = {}
+
+        # index used by `get_names()`, built when first needed (and reset when the storage is updated)
+        self.index: FamiliesIndex = None
+
+        # if set, bounds the number of families for which the variants are loaded
+        self.family_cache: LRUCache = None
+
     def update(
         self,
         data_objects: Iterable[BaseAtomicVariantDataObject],
@@ -257,6 +459,7 @@ class Storage:
         from cp2k_basis.pseudopotential import AtomicPseudopotentialVariant
 
         names_added = set()
+        self.index = None
 
         for obj in data_objects:
             names = list(filter_name(obj.names))
@@ -289,10 +492,10 @@ class Storage:
         if add_metadata:
             for name in names_added:
                 l_logger.info('add metadata to {}'.format(name))
-                add_metadata(self.families[name])
+                add_metadata(self[name])
 
-                if 'tags' in self.families[name].metadata:
-                    self.tags_per_family[name] = self.families[name].metadata['tags']
+                if 'tags' in self[name].metadata:
+                    self.tags_per_family[name] = self[name].metadata['tags']
 
     def _update(self, obj: BaseAtomicVariantDataObject, name: str, variant: str):
 
@@ -300,74 +503,449 @@ class Storage:
 
         if name not in self.families:
             self.families[name] = self.object_type(name)
-            self.elements_per_family[name] = []
+            self._set_elements(name, ElementSet())
 
-        self.families[name].add(obj, variant)
-        self.elements_per_family[name].append(symbol)
+        self[name].add(obj, variant)
+        self.index = None
+
+        element_set = self.element_sets_per_family[name]
+        if symbol not in element_set:
+            self._set_elements(name, ElementSet.from_mask(element_set.mask | (1 << SYMB_TO_Z[symbol])))
+
+    def _set_elements(self, name: str, element_set: ElementSet):
+        self.element_sets_per_family[name] = element_set
+        self.elements_per_family[name] = list(element_set)
 
     def __repr__(self):
         return '<Storage({})>'.format(repr(self.name))
 
     def __getitem__(self, item: str) -> BaseFamilyStorage:
-        return self.families[item]
+        """Get a family. This is the way to access the families (rather than `families`), so that the most recently
+        accessed ones are tracked by `family_cache`, if any.
+        """
+
+        family = self.families[item]
+
+        if self.family_cache is not None:
+            self.family_cache.get_or_put(item, family, family.estimated_size())
+
+        return family
 
     def __contains__(self, item: str) -> bool:
         return item in self.families
 
+    def get_metadata(self, name: str) -> Dict[str, Any]:
+        """Get the metadata of a family, without loading its variants (thus, it is not tracked by `family_cache`)"""
+
+        return self.families[name].metadata
+
+    def set_family_cache(self, max_entries: int = None, max_bytes: int = None):
+        """Only keep the variants of the most recently accessed families (through `__getitem__`) in memory,
+        within a budget of `max_entries` families and/or `max_bytes` (see `BaseFamilyStorage.estimated_size()`).
+        The others are unloaded, which is only possible for families read lazily (see `read_hdf5()`).
+        """
+
+        self.family_cache = LRUCache(max_entries, max_bytes, on_evict=lambda name, family: family.unload())
+
     def __iter__(self) -> Iterable[str]:
         yield from self.families.keys()
 
     def values(self) -> Iterable[BaseFamilyStorage]:
         """Yield all `BaseFamilyStorage`"""
-        yield from self.families.values()
+        for name in self.families:
+            yield self[name]
 
     def tree(self, out=sys.stdout):
         """Print a tree"""
         print('*\n|\n+- {}\n   |'.format(self.name), file=out)
-        for family in self.families.values():
+        for family in self.values():
             family.tree(out)
 
-    def get_names(self, elements: ElementSet, search_name: str = '', search_tags: str = '') -> List[str]:
+    def get_names(self, elements: ElementSet = None, search_name: str = '', search_tags: str = '') -> List[str]:
         """Get all defined names, eventually restricted to a subset of elements
         """
 
-        if search_name:
-            search_name = search_name.lower()
+        if self.index is None:
+            self.build_index()
 
-        names_list = []
-        for name in self:
-            if not search_tags or (name in self.tags_per_family and search_tags in self.tags_per_family[name]):
-                if not search_name or search_name in name.lower():
-                    if not elements or elements <= ElementSet(SYMB_TO_Z[i] for i in self.elements_per_family[name]):
-                        names_list.append(name)
+        return self.index.search(elements, search_name, search_tags)
+
+    def build_index(self):
+        """Build the index used by `get_names()`"""
+
+        self.index = FamiliesIndex(list(self.families), self.element_sets_per_family, self.tags_per_family)
+
+    def dump_hdf5(self, f: h5py.File, format_version: int = HDF5_FORMAT_VERSION, with_text: bool = False):
+        """Dump in HDF5, using the version `format_version` of the format.
+        If `with_text`, the rendered text and preferred names of the variants are also stored (version 2 only).
+        """
 
-        return names_list
+        if with_text and format_version != 2:
+            raise ValueError('text can only be stored in version 2 of the format')
 
-    def dump_hdf5(self, f: h5py.File):
-        main_group = f.require_group(self.name)
+        if format_version == 1:
+            main_group = f.require_group(self.name)
 
-        for key, data_object in self.families.items():
-            data_object.dump_hdf5(main_group.require_group(key))
+            for key in self:
+                self[key].dump_hdf5(main_group.require_group(key))
+        elif format_version == 2:
+            if self.name in f:
+                del f[self.name]
+
+            self._dump_hdf5_v2(f.create_group(self.name), with_text)
+        else:
+            raise ValueError('unknown format version {}'.format(format_version))
+
+    def _dump_hdf5_v2(self, main_group: h5py.Group, with_text: bool = False):
+        """Pack all variants together in a few large arrays (the "pool"), indexed by offsets.
+        Variants with the same content (symbol, names and packed data) are only stored once.
+        The families are also packed, and refer to their variants by their index in the pool.
+        """
+
+        main_group.attrs['format_version'] = 2
+
+        index_per_id: Dict[int, int] = {}
+        objects = []  # keeps the variants, so that their `id()` is not reused if their family is unloaded meanwhile
+        index_per_content: Dict[Tuple[str, Tuple[str, ...], bytes, bytes], int] = {}
+
+        families_offsets = [0]
+        variants = []
+        indices = []
+        sources = []
+
+        symbols = []
+        names = []
+        names_offsets = [0]
+        ints = []
+        ints_offsets = [0]
+        floats = []
+        floats_offsets = [0]
+
+        texts = []
+        preferred_names = []
+
+        for family in self.values():
+            # sort as they would be read from groups
+            for symbol in sorted(family):
+                for variant in sorted(family[symbol]):
+                    obj = family[symbol][variant]
+
+                    if id(obj) not in index_per_id:
+                        obj_ints, obj_floats = obj.pack()
+                        content = (
+                            obj.symbol,
+                            tuple(obj.names),
+                            numpy.array(obj_ints, dtype='i').tobytes(),
+                            obj_floats.astype('d').tobytes()
+                        )
+
+                        if content not in index_per_content:
+                            index_per_content[content] = len(symbols)
+
+                            symbols.append(obj.symbol)
+                            names.extend(obj.names)
+                            names_offsets.append(len(names))
+                            ints.extend(obj_ints)
+                            ints_offsets.append(len(ints))
+                            floats.append(obj_floats)
+                            floats_offsets.append(floats_offsets[-1] + len(obj_floats))
+
+                            if with_text:
+                                texts.append(_remove_source(str(obj), obj.source))
+
+                        index_per_id[id(obj)] = index_per_content[content]
+                        objects.append(obj)
+
+                    variants.append(variant)
+                    indices.append(index_per_id[id(obj)])
+                    sources.append(obj.source)
+
+                    if with_text:
+                        preferred_names.append(family.preferred_name(symbol, variant))
+
+            families_offsets.append(len(variants))
+
+        families_group = main_group.create_group('families')
+        families_group.create_dataset('names', data=list(self.families.keys()), dtype=string_dt)
+        families_group.create_dataset('offsets', data=numpy.array(families_offsets, dtype='i'))
+        families_group.create_dataset('variants', data=variants, dtype=string_dt)
+        families_group.create_dataset('indices', data=numpy.array(indices, dtype='i'))
+        families_group.create_dataset('sources', data=sources, dtype=string_dt)
+        families_group.create_dataset(
+            'metadata',
+            data=[
+                json.dumps({k: v for k, v in self.get_metadata(name).items() if v}, default=_numpy_to_json)
+                for name in self.families
+            ],
+            dtype=string_dt
+        )
+
+        if with_text:
+            families_group.create_dataset('preferred_names', data=preferred_names, dtype=string_dt)
+
+        pool_group = main_group.create_group('pool')
+        pool_group.create_dataset('symbols', data=symbols, dtype=string_dt)
+        pool_group.create_dataset('names', data=names, dtype=string_dt)
+        pool_group.create_dataset('names_offsets', data=numpy.array(names_offsets, dtype='i'))
+        pool_group.create_dataset('ints', data=numpy.array(ints, dtype='i'))
+        pool_group.create_dataset('ints_offsets', data=numpy.array(ints_offsets, dtype='i'))
+        pool_group.create_dataset(
+            'floats', data=numpy.concatenate(floats) if floats else numpy.zeros(0), dtype='d')
+        pool_group.create_dataset('floats_offsets', data=numpy.array(floats_offsets, dtype='i'))
+
+        if with_text:
+            pool_group.create_dataset('texts', data=texts, dtype=string_dt)
 
     @classmethod
-    def read_hdf5(cls, f: h5py.File):
+    def read_hdf5(cls, f: h5py.File, lazy: bool = False):
+        """Read from HDF5, whatever the version of the format.
+
+        If `lazy`, only the list of families, their elements and metadata are read, and the variants of a family are
+        only read when it is first accessed (so `f` must stay open).
+        """
+
         main_group = f[cls.name]
         obj = cls()
 
         obj.date_build = f.attrs.get('date_build', None)
 
-        for key, group in main_group.items():
-            for obj_variant, variant in obj.object_type.iter_hdf5_variants(group):
-                obj._update(obj_variant, key, variant)
+        format_version = main_group.attrs.get('format_version', 1)
+
+        if format_version == 1:
+            obj._read_hdf5_v1(main_group)
+        elif format_version == 2:
+            obj._read_hdf5_v2(main_group, lazy)
+        else:
+            raise ValueError('unknown format version {} for {}'.format(format_version, main_group.name))
 
-            # add metadata
-            obj.families[key].metadata = BaseFamilyStorage._read_metadata_hdf5(group)
+        for key in obj:
+            if not lazy:
+                obj[key].data_objects  # force loading
 
-            if 'tags' in obj.families[key].metadata:
-                obj.tags_per_family[key] = obj.families[key].metadata['tags']
+            metadata = obj.get_metadata(key)
+            if 'tags' in metadata:
+                obj.tags_per_family[key] = metadata['tags']
+
+        obj.build_index()
 
         return obj
 
+    def _read_hdf5_v1(self, main_group: h5py.Group):
+        for key, group in main_group.items():
+            self.families[key] = self.object_type.lazy(
+                key,
+                functools.partial(self.object_type.iter_hdf5_variants, group),
+                BaseFamilyStorage._read_metadata_hdf5(group)
+            )
+
+            self._set_elements(key, ElementSet(SYMB_TO_Z[symbol] for symbol in group))
+
+    def _read_hdf5_v2(self, main_group: h5py.Group, lazy: bool = False):
+        pool_group = main_group['pool']
+        families_group = main_group['families']
+
+        _check_sizes_hdf5(pool_group, ['symbols'], ['names_offsets', 'ints_offsets', 'floats_offsets'])
+        _check_sizes_hdf5(families_group, ['names', 'metadata'], ['offsets'])
+        _check_sizes_hdf5(families_group, ['variants', 'sources'], ['indices'], offset=0)
+
+        symbols = pool_group['symbols'].asstr()[()]
+        Zs = numpy.array([SYMB_TO_Z[symbol] for symbol in symbols], dtype=int)
+        offsets = dict((key, pool_group['{}_offsets'.format(key)][()]) for key in ['names', 'ints', 'floats'])
+
+        # if lazy, data are read from the file, when needed
+        data = {
+            'names': pool_group['names'].asstr(),
+            'ints': pool_group['ints'],
+            'floats': pool_group['floats'],
+        }
+
+        # if the texts are stored, the floats are only read if the variant is used for something else than its text
+        if 'texts' in pool_group:
+            _check_sizes_hdf5(pool_group, ['symbols', 'texts'], [])
+            data['texts'] = pool_group['texts'].asstr()
+
+        if not lazy:
+            data = dict((key, dataset[()]) for key, dataset in data.items())
+
+        # variants shared among families (if they have the same source), as long as they are loaded
+        pool: Dict[Tuple[int, str], BaseAtomicVariantDataObject] = weakref.WeakValueDictionary()
+
+        families_offsets = families_group['offsets'][()]
+        variants = families_group['variants'].asstr()[()]
+        indices = families_group['indices'][()]
+        sources = families_group['sources'].asstr()[()]
+        metadata = families_group['metadata'].asstr()[()]
+
+        preferred_names = None
+        if 'preferred_names' in families_group:
+            _check_sizes_hdf5(families_group, ['variants', 'preferred_names'], [])
+            preferred_names = families_group['preferred_names'].asstr()[()]
+
+        # size of the packed data of each variant of the pool, to estimate the size of the families without loading
+        pool_sizes = 8 * (numpy.diff(offsets['ints']) + numpy.diff(offsets['floats']))
+
+        for i, key in enumerate(families_group['names'].asstr()[()]):
+            rows = slice(families_offsets[i], families_offsets[i + 1])
+
+            family = self.families[key] = self.object_type.lazy(
+                key,
+                functools.partial(
+                    self._iter_hdf5_variants_v2,
+                    data, offsets, symbols, pool, variants[rows], indices[rows], sources[rows]
+                ),
+                json.loads(metadata[i])
+            )
+
+            family.size_hint = int(pool_sizes[indices[rows]].sum()) + sum(len(source) for source in sources[rows])
+
+            if preferred_names is not None:
+                family.preferred_names = dict(
+                    zip(zip(symbols[indices[rows]], variants[rows]), preferred_names[rows]))
+
+            self._set_elements(key, ElementSet(Zs[indices[rows]].tolist()))
+
+    def _iter_hdf5_variants_v2(
+        self,
+        data: Dict[str, Any],
+        offsets: Dict[str, numpy.ndarray],
+        symbols: numpy.ndarray,
+        pool: Dict[Tuple[int, str], BaseAtomicVariantDataObject],
+        variants: numpy.ndarray,
+        indices: numpy.ndarray,
+        sources: numpy.ndarray
+    ) -> Iterable[Tuple[BaseAtomicVariantDataObject, str]]:
+        """Yield the variants of a family, unpacked from the pool (if not already done).
+        Only the rows of the pool used by the family are read, each run of consecutive rows at once.
+
+        If the texts are stored, the variants are created with `lazy_unpack()`, and their floats are only read and
+        unpacked when needed.
+        """
+
+        if len(indices) == 0:
+            return
+
+        variant_type = self.object_type.object_type.object_type
+        with_text = 'texts' in data
+
+        keys = ['names', 'ints'] + ([] if with_text else ['floats'])
+
+        # since the variants are shared, the rows of a family may be far apart in the pool
+        parts_per_index = {}
+        unique_indices = numpy.unique(indices)
+        for run in numpy.split(unique_indices, numpy.flatnonzero(numpy.diff(unique_indices) != 1) + 1):
+            first, last = run[0], run[-1] + 1
+
+            block = {}
+            for key in keys:
+                block[key] = data[key][offsets[key][first]:offsets[key][last]]
+
+            if with_text:
+                block['texts'] = data['texts'][first:last]
+
+            for index in run:
+                parts = {}
+                for key in keys:
+                    parts[key] = block[key][
+                        offsets[key][index] - offsets[key][first]:offsets[key][index + 1] - offsets[key][first]]
+
+                if with_text:
+                    parts['text'] = block['texts'][index - first]
+
+                parts_per_index[index] = parts
+
+        for variant, index, source in zip(variants, indices, sources):
+            obj = pool.get((index, source))
+            if obj is None:
+                parts = parts_per_index[index]
+
+                if with_text:
+                    obj = variant_type.lazy_unpack(
+                        symbols[index],
+                        list(parts['names']),
+                        parts['ints'],
+                        functools.partial(
+                            Storage._unpack_hdf5_variant_v2,
+                            variant_type, data, offsets, symbols[index], list(parts['names']), parts['ints'], index,
+                            source
+                        ),
+                        source=source,
+                        text=_add_source(parts['text'], source)
+                    )
+                else:
+                    obj = variant_type.unpack(
+                        symbols[index],
+                        list(parts['names']),
+                        parts['ints'],
+                        parts['floats'],
+                        source=source
+                    )
+
+                pool[(index, source)] = obj
+
+            yield obj, variant
+
+    @staticmethod
+    def _unpack_hdf5_variant_v2(
+        variant_type: type,
+        data: Dict[str, Any],
+        offsets: Dict[str, numpy.ndarray],
+        symbol: str,
+        names: List[str],
+        ints: numpy.ndarray,
+        index: int,
+        source: str
+    ) -> BaseAtomicVariantDataObject:
+        """Read the floats of variant `index` of the pool, and unpack it"""
+
+        return variant_type.unpack(
+            symbol, names, ints, data['floats'][offsets['floats'][index]:offsets['floats'][index + 1]], source=source)
+
+
+def _remove_source(text: str, source: str) -> str:
+    """Remove the source from a rendered variant, since the text of a variant of the pool is shared by all the
+    families, whatever their source (the second line is the source, if any)
+    """
+
+    if not source:
+        return text
+
+    first_line, _, rest = text.partition('\n')
+    return first_line + '\n' + rest.partition('\n')[2]
+
+
+def _add_source(text: str, source: str) -> str:
+    """Revert `_remove_source()`"""
+
+    if not source:
+        return text
+
+    first_line, _, rest = text.partition('\n')
+    return '{}\n# SOURCE: {}\n{}'.format(first_line, source, rest)
+
+
+def _numpy_to_json(value: Any) -> Any:
+    """Convert numpy values (e.g., from metadata read in HDF5) into something that can be dumped in JSON"""
+
+    if isinstance(value, (numpy.ndarray, numpy.generic)):
+        return value.tolist()
+
+    raise TypeError('cannot convert {} to JSON'.format(type(value)))
+
+
+def _check_sizes_hdf5(group: h5py.Group, datasets: List[str], offsets_datasets: List[str], offset: int = 1):
+    """Check that `offsets_datasets` have the same length as `datasets`, plus `offset`
+    """
+
+    size = group[datasets[0]].shape[0]
+
+    for dataset in datasets[1:]:
+        if group[dataset].shape != (size, ):
+            raise ValueError('Dataset `{}` in {} must have length {}'.format(dataset, group.name, size))
+
+    for dataset in offsets_datasets:
+        if group[dataset].shape != (size + offset, ):
+            raise ValueError('Dataset `{}` in {} must have length {}'.format(dataset, group.name, size + offset))
+
 
 class Filter:
     """Filter a list of string based on a set of rules of the form `(pattern, replacement)`, where
@@ -1,12 +1,13 @@
 import h5py
 import numpy
 
-from typing import List, Iterable
+from typing import List, Iterable, Tuple
 
 from cp2k_basis import logger
 from cp2k_basis.elements import L_TO_SHELL
-from cp2k_basis.parser import BaseParser, TokenType
+from cp2k_basis.parser import BaseParser, TokenType, ParserSyntaxError
 from cp2k_basis.base_objects import BaseAtomicVariantDataObject, BaseAtomicDataObject, BaseFamilyStorage, Storage
+from cp2k_basis.render import render_contraction, render_atomic_basis_set_variant
 
 l_logger = logger.getChild('basis_set')
 
@@ -40,18 +41,7 @@ class Contraction:
         self.coefficients = coefficients
 
     def __str__(self) -> str:
-        r = '{} {} {} {} {}\n'.format(
-            self.principle_n,
-            self.l_min,
-            self.l_max,
-            self.nfunc,
-            ' '.join(str(x) for x in self.nshell))
-
-        fmt = '{:>16.12f}' + ' {: .12f}' * sum(self.nshell) + '\n'
-        for i in range(self.nfunc):
-            r += fmt.format(self.exponents[i], *self.coefficients[i])
-
-        return r
+        return render_contraction(self)
 
     def __repr__(self):
         return '<Contraction({}, {}, {}, {}, {})>'.format(
@@ -95,8 +85,33 @@ class Contraction:
 
         return cls(principle_n, l_min, l_max, nfunc, nshell, dset_exp_coefs[:, 0], dset_exp_coefs[:, 1:])
 
+    def pack(self) -> Tuple[List[int], numpy.ndarray]:
+        """Pack as `(principle_n, l_min, l_max, nfunc, len(nshell), nshell[0], ...)` and the exponents and
+        coefficients, row by row
+        """
+
+        ints = [self.principle_n, self.l_min, self.l_max, self.nfunc, len(self.nshell)]
+        ints.extend(self.nshell)
+
+        return ints, numpy.column_stack((self.exponents, self.coefficients)).ravel()
+
+    @classmethod
+    def unpack(cls, ints: numpy.ndarray, floats: numpy.ndarray) -> 'Contraction':
+        principle_n, l_min, l_max, nfunc, _ = ints[:5].tolist()
+        nshell = ints[5:].tolist()
+
+        if floats.shape != (nfunc * (1 + sum(nshell)), ):
+            raise ValueError('contraction must contains {}x{} data'.format(nfunc, sum(nshell) + 1))
+
+        exp_coefs = floats.reshape(nfunc, 1 + sum(nshell))
+
+        return cls(principle_n, l_min, l_max, nfunc, nshell, exp_coefs[:, 0], exp_coefs[:, 1:])
+
 
 class AtomicBasisSetVariant(BaseAtomicVariantDataObject):
+
+    lazy_attributes = ('contractions', )
+
     def __init__(self, symbol: str, names: List[str], contractions: List[Contraction], source: str = ''):
         super().__init__(symbol, names, source)
         self.contractions = contractions
@@ -125,17 +140,10 @@ class AtomicBasisSetVariant(BaseAtomicVariantDataObject):
         return '[{}]'.format(self._representation(True))
 
     def __str__(self) -> str:
-        r = '# {} [{}|{}]\n'.format(
-            self.symbol, self._representation(False, sep=''), self._representation(True, sep=''))
-
-        if self.source:
-            r += '# SOURCE: {}\n'.format(self.source)
-
-        r += '{}  {}\n{}\n'.format(self.symbol, ' '.join(self.names), len(self.contractions))
+        if self.text is not None:
+            return self.text
 
-        r += ''.join(str(c) for c in self.contractions)
-
-        return r
+        return render_atomic_basis_set_variant(self)
 
     def __repr__(self):
         return '<AtomicBasisSet({}, {})>'.format(repr(self.symbol), repr(self.names))
@@ -179,6 +187,44 @@ class AtomicBasisSetVariant(BaseAtomicVariantDataObject):
 
         return obj
 
+    def pack(self) -> Tuple[List[int], numpy.ndarray]:
+        """Pack as `(len(contractions), ...)`, followed by the packed contractions"""
+
+        ints = [len(self.contractions)]
+        floats = []
+
+        for contraction in self.contractions:
+            contraction_ints, contraction_floats = contraction.pack()
+            ints.extend(contraction_ints)
+            floats.append(contraction_floats)
+
+        return ints, numpy.concatenate(floats) if floats else numpy.zeros(0)
+
+    @classmethod
+    def unpack(
+        cls, symbol: str, names: List[str], ints: numpy.ndarray, floats: numpy.ndarray, source: str = ''
+    ) -> 'AtomicBasisSetVariant':
+
+        contractions = []
+        ints_position = 1
+        floats_position = 0
+
+        for i in range(ints[0]):
+            nfunc, len_nshell = ints[ints_position + 3:ints_position + 5].tolist()
+            ints_end = ints_position + 5 + len_nshell
+            floats_end = floats_position + nfunc * (1 + sum(ints[ints_position + 5:ints_end].tolist()))
+
+            contractions.append(
+                Contraction.unpack(ints[ints_position:ints_end], floats[floats_position:floats_end]))
+
+            ints_position = ints_end
+            floats_position = floats_end
+
+        if ints_position != len(ints) or floats_position != len(floats):
+            raise ValueError('packed data of {} do not match its {} contractions'.format(symbol, ints[0]))
+
+        return cls(symbol, names, contractions, source=source)
+
 
 class AtomicBasisSet(BaseAtomicDataObject):
     object_type = AtomicBasisSetVariant
@@ -198,20 +244,46 @@ class BasisSetsStorage(Storage):
 
 class AtomicBasisSetsParser(BaseParser):
 
-    def iter_atomic_basis_set_variants(self) -> Iterable[AtomicBasisSetVariant]:
+    def iter_data_objects(self, lazy: bool = False) -> Iterable[AtomicBasisSetVariant]:
+        return self.iter_atomic_basis_set_variants(lazy)
+
+    def data_object(self) -> AtomicBasisSetVariant:
+        return self.atomic_basis_set_variant()
+
+    def iter_atomic_basis_set_variants(self, lazy: bool = False) -> Iterable[AtomicBasisSetVariant]:
         """Basis set
         BASIS_SETS := ATOMIC_BASIS_SET* EOS
+
+        If `lazy`, the contractions of each basis set are only parsed when first accessed.
         """
 
         self.skip()
 
         while self.current_token.type != TokenType.EOS:
-            yield self.atomic_basis_set_variant()
+            if lazy:
+                yield self.lazy_atomic_basis_set_variant()
+            else:
+                yield self.atomic_basis_set_variant()
 
             self.skip()
 
         self.eat(TokenType.EOS)
 
+    def lazy_atomic_basis_set_variant(self) -> AtomicBasisSetVariant:
+        """Only parse the first line of ATOMIC_BASIS_SET (i.e., symbol and names)
+        """
+
+        line = self.current_token.line
+        first_line, _, loader = self.lazy_record()
+
+        if len(first_line) < 2:
+            raise ParserSyntaxError('expected symbol and names on line {}'.format(line))
+
+        symbol = first_line[0][0].upper() + first_line[0][1:].lower()
+
+        return AtomicBasisSetVariant.lazy(
+            symbol, first_line[1:], loader, source=(self.source + '#L{}'.format(line)) if self.source else '')
+
     def atomic_basis_set_variant(self) -> AtomicBasisSetVariant:
         """
         ATOMIC_BASIS_SET := WORD SPACE WORD (SPACE WORD)* NL INT NL CONTRACTION*
@@ -280,21 +352,9 @@ class AtomicBasisSetsParser(BaseParser):
 
         self.skip()
 
-        exponents = numpy.zeros(nfunc)
-        coefficients = numpy.zeros((nfunc, sum(nshell)))
-
-        for i in range(nfunc):
-            c = [self.number()]
-            for j in range(sum(nshell)):
-                self.eat(TokenType.SPACE)
-                c.append(self.number())
-            exponents[i] = c[0]
-            coefficients[i] = c[1:]
-
-            # skip anything remaining on this line (see `O` in $CP2K/cp2l/data/GTH_BASIS_SET)
-            while self.current_token.type not in [TokenType.NL, TokenType.EOS]:
-                self.next()
-
-            self.skip()
+        # read all exponents and coefficients at once, skipping anything remaining on each line
+        # (see `O` in $CP2K/cp2l/data/GTH_BASIS_SET)
+        exp_coefs = self.numbers_block([1 + sum(nshell)] * nfunc, skip_extra=True).reshape(nfunc, 1 + sum(nshell))
+        self.skip()
 
-        return Contraction(principle_n, l_min, l_max, nfunc, nshell, exponents, coefficients)
+        return Contraction(principle_n, l_min, l_max, nfunc, nshell, exp_coefs[:, 0], exp_coefs[:, 1:])
@@ -0,0 +1,160 @@
+import collections
+import threading
+
+from typing import Any, Callable, Dict, Hashable, List, Tuple, Union
+
+from cp2k_basis import logger
+
+l_logger = logger.getChild('cache')
+
+
+class LRUCache:
+    """Least-recently-used cache, bounded in number of entries (`max_entries`) and/or in size (`max_bytes`, based on
+    the size given for each entry).
+    A bound set to `None` is not enforced.
+
+    When an entry is evicted, `on_evict(key, value)` is called, if given.
+    The cache is thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        max_bytes: int = None,
+        on_evict: Callable[[Hashable, Any], None] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+
+        self.entries: Dict[Hashable, Any] = collections.OrderedDict()
+        self.sizes: Dict[Hashable, int] = {}
+        self.current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get the value for `key` (which becomes the most recently used), or `default` if it is not there"""
+
+        with self._lock:
+            try:
+                value = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+            return value
+
+    def put(self, key: Hashable, value: Any, size: int = 0):
+        """Add (or replace) the value for `key`, then evict the least recently used entries if a bound is exceeded.
+        The last entry is never evicted, even if it is larger than `max_bytes`.
+        """
+
+        with self._lock:
+            evicted = self._put(key, value, size)
+
+        self._evicted(evicted)
+
+    def get_or_put(self, key: Hashable, value: Any, size: int = 0) -> Any:
+        """Get the value for `key` (as `get()`), or, if it is not there, add `value` for it (as `put()`) and return it.
+        Both are done at once, so that two threads cannot add a value for the same key.
+        """
+
+        with self._lock:
+            try:
+                existing = self.entries[key]
+            except KeyError:
+                self.misses += 1
+                evicted = self._put(key, value, size)
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+
+                return existing
+
+        self._evicted(evicted)
+
+        return value
+
+    def _put(self, key: Hashable, value: Any, size: int) -> List[Tuple[Hashable, Any]]:
+        """Add the value (the lock must be held), and return the evicted entries"""
+
+        evicted = []
+
+        if key in self.entries:
+            self.current_bytes -= self.sizes[key]
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        self.sizes[key] = size
+        self.current_bytes += size
+
+        while len(self.entries) > 1 and self._over_budget():
+            evicted_key, evicted_value = self.entries.popitem(last=False)
+            self.current_bytes -= self.sizes.pop(evicted_key)
+            self.evictions += 1
+            evicted.append((evicted_key, evicted_value))
+
+        return evicted
+
+    def _evicted(self, evicted: List[Tuple[Hashable, Any]]):
+        """Call `on_evict()` for the evicted entries (outside of the lock)"""
+
+        for evicted_key, evicted_value in evicted:
+            l_logger.debug('evict {}'.format(repr(evicted_key)))
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted_value)
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self.entries) > self.max_entries:
+            return True
+
+        return self.max_bytes is not None and self.current_bytes > self.max_bytes
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove `key` (not counted as an eviction), and return its value, or `default`"""
+
+        with self._lock:
+            if key not in self.entries:
+                return default
+
+            self.current_bytes -= self.sizes.pop(key)
+            return self.entries.pop(key)
+
+    def clear(self):
+        """Remove all entries (not counted as evictions)"""
+
+        with self._lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Union[int, float, None]]:
+        """Get the statistics of the cache"""
+
+        with self._lock:
+            requests = self.hits + self.misses
+
+            return dict(
+                entries=len(self.entries),
+                bytes=self.current_bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                hit_rate=self.hits / requests if requests > 0 else None
+            )
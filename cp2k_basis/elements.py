@@ -131,9 +131,42 @@ def print_availability(name, atoms: List[str], not_avail: str = '..'):
     ]))
 
 
+def iter_bits(mask: int) -> Iterable[int]:
+    """Yield the position of the bits set in `mask`, in increasing order"""
+
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
 class ElementSet:
+    """Set of elements, stored as a bitmask (bit `Z` is set if element `Z` is in the set), so that set operations
+    are bitwise operations.
+    """
+
     def __init__(self, elements: Iterable[int] = None):
-        self.elements: frozenset = frozenset(elements) if elements else {}
+        mask = 0
+        if elements:
+            for Z in elements:
+                mask |= 1 << Z
+
+        self.mask = mask
+
+    @classmethod
+    def from_mask(cls, mask: int) -> 'ElementSet':
+        obj = cls.__new__(cls)
+        obj.mask = mask
+        return obj
+
+    @property
+    def elements(self) -> frozenset:
+        return frozenset(self._iter_Z())
+
+    def _iter_Z(self) -> Iterable[int]:
+        """Yield Z values, in increasing order"""
+
+        return iter_bits(self.mask)
 
     def _elementset_or_raise(self, o):
         if type(o) is ElementSet:
@@ -145,42 +178,45 @@ class ElementSet:
 
     def __eq__(self, other: Union['ElementSet', str]) -> bool:
         other = self._elementset_or_raise(other)
-        return self.elements == other.elements
+        return self.mask == other.mask
+
+    def __hash__(self) -> int:
+        return hash(self.mask)
 
     def __or__(self, other: Union['ElementSet', str]) -> 'ElementSet':
         other = self._elementset_or_raise(other)
-        return ElementSet(self.elements | other.elements)
+        return ElementSet.from_mask(self.mask | other.mask)
 
     def __and__(self, other: Union['ElementSet', str]) -> 'ElementSet':
         other = self._elementset_or_raise(other)
-        return ElementSet(self.elements & other.elements)
+        return ElementSet.from_mask(self.mask & other.mask)
 
     def __sub__(self, other: Union['ElementSet', str]) -> 'ElementSet':
         other = self._elementset_or_raise(other)
-        return ElementSet(self.elements - other.elements)
+        return ElementSet.from_mask(self.mask & ~other.mask)
 
     def __contains__(self, item: str):
-        return ElementSet._Z(item) in self.elements
+        return (self.mask >> ElementSet._Z(item)) & 1 == 1
 
     def __le__(self, other: Union['ElementSet', str]):
         other = self._elementset_or_raise(other)
-        return self.elements.issubset(other.elements)
+        return self.mask & ~other.mask == 0
 
-    def __iter__(self) -> Iterable[str]:
+    def __len__(self) -> int:
+        return bin(self.mask).count('1')
 
-        # NOTE: order not guaranteed
-        for i in self.elements:
+    def __iter__(self) -> Iterable[str]:
+        for i in self._iter_Z():
             yield Z_TO_SYMB[i]
 
     def iter_sorted(self) -> Iterable[str]:
-        for i in sorted(self.elements):
-            yield Z_TO_SYMB[i]
+        yield from self
 
     def __repr__(self):
-        return '<ElementSet({})>'.format(', '.join(Z_TO_SYMB[i] for i in self.elements))
+        return '<ElementSet({})>'.format(', '.join(self))
 
     def __str__(self):
-        return ','.join(Z_TO_SYMB[i] for i in self.elements)
+        return ','.join(self)
 
     @staticmethod
     def _Z(w: str) -> int:
@@ -202,7 +238,7 @@ class ElementSet:
         """Create an element set
         """
         elements = inp.split(',')
-        resulting_set = set()
+        mask = 0
 
         for elmt in elements:
             if '-' in elmt:  # it is a range
@@ -213,11 +249,11 @@ class ElementSet:
                 if start > end:
                     start, end = end, start
 
-                resulting_set |= set(range(start, end + 1))
+                mask |= ((1 << (end + 1)) - 1) ^ ((1 << start) - 1)
             else:
-                resulting_set.add(ElementSet._Z(elmt))
+                mask |= 1 << ElementSet._Z(elmt)
 
-        return cls(resulting_set)
+        return cls.from_mask(mask)
 
 
 class ElementSetField(fields.Field):
@@ -0,0 +1,75 @@
+from typing import Dict, Iterable, List
+
+from cp2k_basis import logger
+from cp2k_basis.elements import ElementSet, iter_bits
+
+l_logger = logger.getChild('index')
+
+
+def _trigrams(name: str) -> Iterable[str]:
+    return (name[i:i + 3] for i in range(len(name) - 2))
+
+
+class FamiliesIndex:
+    """Inverted index over the families of a storage, to search them by elements, tag and (part of) name.
+
+    Each family gets a position (in the order of `names`), and a set of families is a bitmap, where bit `i` is set if
+    the family at position `i` is in the set.
+    Families are indexed per element, per tag and per trigram of their (lowercased) name.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        elements_per_family: Dict[str, ElementSet],
+        tags_per_family: Dict[str, List[str]]
+    ):
+        self.names = names
+        self.lowered_names = [name.lower() for name in names]
+        self.all_families = (1 << len(names)) - 1
+
+        self.families_per_element: Dict[int, int] = {}
+        self.families_per_tag: Dict[str, int] = {}
+        self.families_per_trigram: Dict[str, int] = {}
+
+        for i, name in enumerate(names):
+            bit = 1 << i
+
+            for Z in iter_bits(elements_per_family[name].mask):
+                self.families_per_element[Z] = self.families_per_element.get(Z, 0) | bit
+
+            for tag in tags_per_family.get(name, []):
+                self.families_per_tag[tag] = self.families_per_tag.get(tag, 0) | bit
+
+            for trigram in set(_trigrams(self.lowered_names[i])):
+                self.families_per_trigram[trigram] = self.families_per_trigram.get(trigram, 0) | bit
+
+        l_logger.debug('index {} families, {} trigrams'.format(len(names), len(self.families_per_trigram)))
+
+    def search(self, elements: ElementSet = None, search_name: str = '', search_tags: str = '') -> List[str]:
+        """Get the names of the families which contain all `elements`, have `search_tags` as a tag and contain
+        `search_name` in their name (case insensitive).
+        Empty criteria are not applied.
+        """
+
+        bitmap = self.all_families
+
+        if elements:
+            for Z in iter_bits(elements.mask):
+                bitmap &= self.families_per_element.get(Z, 0)
+
+        if search_tags:
+            bitmap &= self.families_per_tag.get(search_tags, 0)
+
+        if search_name:
+            search_name = search_name.lower()
+
+            # the trigrams only give candidates, which are then checked
+            for trigram in _trigrams(search_name):
+                bitmap &= self.families_per_trigram.get(trigram, 0)
+                if not bitmap:
+                    break
+
+            return [self.names[i] for i in iter_bits(bitmap) if search_name in self.lowered_names[i]]
+
+        return [self.names[i] for i in iter_bits(bitmap)]
@@ -1,4 +1,14 @@
-from typing import Iterator, Callable, List, Union
+import codecs
+import functools
+import io
+import itertools
+import mmap
+import re
+
+import numpy
+
+from concurrent.futures import Executor
+from typing import Iterator, Callable, List, Union, IO, Tuple, Any
 from enum import Enum, unique
 
 
@@ -13,8 +23,54 @@ class TokenType(Enum):
 SPACES = [' ', '\t']
 NLS = ['\n', '\r']
 
+# one group per token type, named after the value of the corresponding `TokenType`
+TOKEN_REGEX = re.compile(r'(?P<SPC>[ \t]+)|(?P<NLW>[\n\r]+)|(?P<WRD>[^ \t\n\r]+)')
+TOKEN_TYPES = dict((t.value, t) for t in TokenType)
+
+# a record starts with a line containing (at least) two words, the first one being a symbol
+RECORD_REGEX = re.compile(r'^[ \t]*[A-Za-z]+[ \t]+[^\s#]', re.MULTILINE)
+
+CHUNK_SIZE = 2 ** 16
+
+ParserInput = Union[str, bytes, IO, mmap.mmap]
+
+
+def iter_chunks(inp: ParserInput, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the content of `inp` by chunks of (at most) `chunk_size` characters.
+
+    `inp` might be a string (which is yield at once), bytes, or any text or binary stream (an opened file, a
+    `mmap.mmap`, etc). Bytes are decoded as UTF-8.
+    """
+
+    if isinstance(inp, str):
+        yield inp
+        return
+
+    if isinstance(inp, (bytes, bytearray)):
+        inp = io.BytesIO(inp)
+
+    decoder = None
+
+    while True:
+        chunk = inp.read(chunk_size)
+
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            text = decoder.decode(chunk, final=len(chunk) == 0)
+        else:
+            text = chunk
+
+        if text:
+            yield text
+
+        if not chunk:
+            break
+
 
 class Token:
+    __slots__ = ('type', 'value', 'position', 'line')
+
     def __init__(self, typ_: TokenType, value: str, position: int = -1, line: int = -1):
         self.type = typ_
         self.value = value
@@ -39,6 +95,20 @@ class Lexer:
         self.position = 0
         self.line = 1
 
+        self.tokenizer: Iterator[Token] = None
+
+    def next_token(self) -> Token:
+        """Get the next token (`EOS` if the end of the input was reached)
+        """
+
+        if self.tokenizer is None:
+            self.tokenizer = self.tokenize()
+
+        try:
+            return next(self.tokenizer)
+        except StopIteration:
+            return Token(TokenType.EOS, '\0')
+
     def _get_next_stop(self, must_be: Callable) -> int:
         end = self.position + 1
         while end < len(self.input) and must_be(self.input[end]):
@@ -46,6 +116,26 @@ class Lexer:
 
         return end
 
+    def readline(self, consume: bool = True) -> str:
+        """Return the input up to the end of the current line (included).
+        Unless `consume` is `False`, the position is moved after that line.
+        """
+
+        start = self.position
+        end = self.input.find('\n', start)
+
+        if end < 0:
+            line = self.input[start:]
+        else:
+            line = self.input[start:end + 1]
+
+        if consume:
+            self.position += len(line)
+            if end >= 0:
+                self.line += 1
+
+        return line
+
     def tokenize(self) -> Iterator[Token]:
         while self.position < len(self.input):
             start = self.position
@@ -65,6 +155,124 @@ class Lexer:
         yield Token(TokenType.EOS, '\0', self.position)
 
 
+def index_records(inp: str) -> List[Tuple[int, int]]:
+    """Find where each record (i.e., each atomic basis set or pseudopotential) starts in `inp`.
+    Return a list of `(position, line)`.
+
+    Since comments start with `#`, they are never mistaken for the start of a record.
+    """
+
+    records = []
+    line = 1
+    previous = 0
+
+    for m in RECORD_REGEX.finditer(inp):
+        line += inp.count('\n', previous, m.start())
+        previous = m.start()
+        records.append((m.start(), line))
+
+    return records
+
+
+def _parse_records(parser_type: type, inp: str, source: str, line: int) -> List[Any]:
+    return list(parser_type(inp, source=source, line=line).iter_data_objects())
+
+
+def _parse_record(parser_type: type, inp: str, start: int, end: int, source: str, line: int) -> Any:
+    return parser_type(inp[start:end], source=source, line=line).data_object()
+
+
+class RegexLexer(Lexer):
+    """Split string in words, separated by spaces or newlines.
+
+    Yield the same tokens as `Lexer`, but each token is found by matching `TOKEN_REGEX` at the current position
+    rather than by looking at each character in turn.
+
+    The input is read by chunks (see `iter_chunks()`), so that it can be a stream. Only the part of the input that
+    is not consumed yet is kept in `self.input`, which starts at `self.offset` in the whole input.
+    """
+
+    def __init__(self, inp: ParserInput, chunk_size: int = CHUNK_SIZE):
+        super().__init__('')
+
+        self.chunks = iter_chunks(inp, chunk_size)
+        self.offset = 0
+
+    def _fill(self) -> bool:
+        """Drop what was already consumed from `self.input`, and append the next chunk to it.
+        Return `False` if the whole input was already read.
+        """
+
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            return False
+
+        self.input = self.input[self.position - self.offset:] + chunk
+        self.offset = self.position
+
+        return True
+
+    def readline(self, consume: bool = True) -> str:
+        start = self.position - self.offset
+        end = self.input.find('\n', start)
+
+        while end < 0:
+            searched = len(self.input) - (self.position - self.offset)
+            if not self._fill():
+                break
+
+            start = 0
+            end = self.input.find('\n', searched)
+
+        if end < 0:
+            line = self.input[start:]
+        else:
+            line = self.input[start:end + 1]
+
+        if consume:
+            self.position += len(line)
+            if end >= 0:
+                self.line += 1
+
+        return line
+
+    def next_token(self) -> Token:
+        """Get the next token (`EOS` if the end of the input was reached).
+        Contrary to `tokenize()`, there is no generator involved.
+        """
+
+        while True:
+            start = self.position - self.offset
+            m = TOKEN_REGEX.match(self.input, start)
+
+            # the token might continue in the next chunk
+            if (m is None or m.end() == len(self.input)) and self._fill():
+                continue
+
+            if m is None:
+                return Token(TokenType.EOS, '\0', self.position)
+
+            typ = TOKEN_TYPES[m.lastgroup]
+            value = m.group()
+
+            token = Token(typ, value, self.offset + start, self.line)
+            self.position = self.offset + m.end()
+
+            if typ is TokenType.NL:
+                self.line += value.count('\n')
+
+            return token
+
+    def tokenize(self) -> Iterator[Token]:
+        while True:
+            token = self.next_token()
+            yield token
+
+            if token.type is TokenType.EOS:
+                break
+
+
 class ParserSyntaxError(Exception):
     pass
 
@@ -74,29 +282,101 @@ class ParserNode:
 
 
 class BaseParser:
-    def __init__(self, inp: str, source: str = ''):
-        self.lexer = Lexer(inp)
-        self.tokenizer = self.lexer.tokenize()
+    lexer_type = RegexLexer
+
+    def __init__(self, inp: ParserInput, source: str = '', line: int = 1):
+        self.input = inp
+        self.lexer = self.lexer_type(inp)
+        self.lexer.line = line
         self.current_token: Token = None
         self.source = source
 
         self.next()
 
+    def iter_data_objects(self, lazy: bool = False) -> Iterator[Any]:
+        """Yield all the objects (records) defined in the input.
+        If `lazy`, only the information found in the first line(s) of each record is parsed right away.
+        """
+
+        raise NotImplementedError()
+
+    def data_object(self) -> Any:
+        """Parse one object (record)"""
+
+        raise NotImplementedError()
+
+    @classmethod
+    def iter_data_objects_in_parallel(
+            cls, inp: str, executor: Executor, source: str = '', records_per_task: int = 64) -> Iterator[Any]:
+        """Split `inp` in records (see `index_records()`), and parse them by groups of `records_per_task` in
+        `executor` (e.g., a `concurrent.futures.ProcessPoolExecutor`).
+        The objects are yield in the same order as `iter_data_objects()` would.
+
+        Note: all the tasks are submitted before this function returns, so that parsing starts right away.
+        """
+
+        records = index_records(inp)
+        tasks = []
+
+        for i in range(0, len(records), records_per_task):
+            start, line = records[i]
+            end = records[i + records_per_task][0] if i + records_per_task < len(records) else len(inp)
+            tasks.append(executor.submit(_parse_records, cls, inp[start:end], source, line))
+
+        return (obj for task in tasks for obj in task.result())
+
     def next(self):
         """Get next token"""
 
-        try:
-            self.current_token = next(self.tokenizer)
-        except StopIteration:
-            self.current_token = Token(TokenType.EOS, '\0')
+        self.current_token = self.lexer.next_token()
+
+    def lazy_record(self) -> Tuple[List[str], List[str], Callable[[], Any]]:
+        """Go through the current record line by line, without parsing it.
+
+        Return the words of its first line, the words of the next line that is neither blank nor a comment (if any),
+        and a function that parses the whole record (with `data_object()`) when called.
+        If the input is a string, only the position of the record is kept, so that it is not copied until then.
+        """
+
+        self.expect(TokenType.WORD)
+
+        start, line = self.current_token.position, self.current_token.line
+        lines = [self.current_token.value + self.lexer.readline()]
+        second_line = []
+
+        while True:
+            text = self.lexer.readline(consume=False)
+            if not text or RECORD_REGEX.match(text):
+                break
+
+            self.lexer.readline()
+
+            if not second_line:
+                words = text.split()
+                if len(words) > 0 and words[0][0] != '#':
+                    second_line = words
+
+            if not isinstance(self.input, str):
+                lines.append(text)
+
+        end = self.lexer.position
+        self.next()
+
+        if isinstance(self.input, str):
+            loader = functools.partial(_parse_record, type(self), self.input, start, end, self.source, line)
+        else:
+            text = ''.join(lines)
+            loader = functools.partial(_parse_record, type(self), text, 0, len(text), self.source, line)
+
+        return lines[0].split(), second_line, loader
 
     def expect(self, typ: TokenType):
-        if self.current_token.type != typ:
+        if self.current_token.type is not typ:
             raise ParserSyntaxError('expected {}, got {}'.format(typ, self.current_token))
 
     def eat(self, typ: TokenType):
-        if self.current_token.type == typ:
-            self.next()
+        if self.current_token.type is typ:
+            self.current_token = self.lexer.next_token()
         else:
             raise ParserSyntaxError('expected {}, got {}'.format(typ, self.current_token))
 
@@ -110,27 +390,24 @@ class BaseParser:
         if self.current_token.value[0] != '#':
             raise ParserSyntaxError('expected WORD starting with `#` for COMMENT')
 
-        self.eat(TokenType.WORD)
-        while self.current_token.type not in [TokenType.NL, TokenType.EOS]:
-            self.next()
+        # the rest of the line is skipped at once, rather than token by token
+        self.lexer.readline()
+        self.next()
 
-        if self.current_token.type == TokenType.NL:
+        if self.current_token.type is TokenType.NL:
             self.next()
 
     def skip(self):
         """Go to the next non-comment word
         """
 
-        while True:
-            if self.current_token.type == TokenType.EOS:
-                break
-            elif self.current_token.type != TokenType.WORD:
+        while self.current_token.type is not TokenType.EOS:
+            if self.current_token.type is not TokenType.WORD:
                 self.next()
+            elif self.current_token.value[0] == '#':
+                self.comment()
             else:
-                if self.current_token.value[0] == '#':
-                    self.comment()
-                else:
-                    break
+                break
 
     def integer(self) -> int:
         """Parse integer
@@ -181,3 +458,63 @@ class BaseParser:
             self.eat(TokenType.NL)
 
         return result
+
+    def numbers_block(self, row_sizes: List[int], skip_extra: bool = False) -> numpy.ndarray:
+        """Parse a block of `len(row_sizes)` lines, the i-th one containing `row_sizes[i]` numbers, starting at the
+        current token. Comments and blank lines in between are skipped.
+        If `skip_extra` is set, anything remaining on a line after its numbers is skipped as well.
+
+        Rather than going through tokens, the lines are read directly from the lexer, and all the numbers are
+        converted at once. They are returned as a flat array.
+
+        BLOCK := (FLOAT (SPACE FLOAT)* NL)*
+        """
+
+        if len(row_sizes) == 0:
+            return numpy.zeros(0)
+
+        self.expect(TokenType.WORD)
+
+        line = self.current_token.line
+        position = self.current_token.position
+        text = self.current_token.value + self.lexer.readline()
+        values = []
+        rows = []  # (line, position, text), to report errors
+
+        for i, size in enumerate(row_sizes):
+            if i > 0:
+                line = self.lexer.line
+                position = self.lexer.position
+                text = self.lexer.readline()
+
+            words = text.split()
+            while len(words) == 0 or words[0][0] == '#':
+                if not text:
+                    raise ParserSyntaxError('expected {} numbers on line {}, got EOS'.format(size, line))
+
+                line = self.lexer.line
+                position = self.lexer.position
+                text = self.lexer.readline()
+                words = text.split()
+
+            if len(words) < size or (len(words) > size and not skip_extra):
+                raise ParserSyntaxError('expected {} numbers on line {}, got {}'.format(size, line, repr(text)))
+
+            values.extend(words[:size])
+            rows.append((line, position, text))
+
+        self.next()
+
+        try:
+            return numpy.array(values, dtype=float)
+        except ValueError:
+            # find the culprit, row by row
+            for (line, position, text), size in zip(rows, row_sizes):
+                for match in itertools.islice(re.finditer(r'\S+', text), size):
+                    try:
+                        float(match.group())
+                    except ValueError:
+                        raise ParserSyntaxError('expected number, got {}'.format(
+                            Token(TokenType.WORD, match.group(), position + match.start(), line)))
+
+            raise
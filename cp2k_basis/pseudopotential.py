@@ -1,12 +1,12 @@
-from typing import List, Iterable
+from typing import Callable, List, Iterable, Tuple
 
 import h5py
 import numpy
 
 from cp2k_basis import logger
 from cp2k_basis.base_objects import BaseAtomicDataObject, BaseFamilyStorage, Storage, BaseAtomicVariantDataObject
-from cp2k_basis.elements import SYMB_TO_Z, L_TO_SHELL
-from cp2k_basis.parser import BaseParser, TokenType
+from cp2k_basis.parser import BaseParser, TokenType, ParserSyntaxError
+from cp2k_basis.render import render_nonlocal_projector, render_atomic_pseudopotential_variant
 
 
 l_logger = logger.getChild('pseudopotentials')
@@ -25,17 +25,7 @@ class NonLocalProjector:
         self.coefficients = coefficients
 
     def __str__(self) -> str:
-        r = '{:16.8f} {:>3}'.format(self.radius, self.nfunc)
-
-        for i in range(self.nfunc):
-            if i != 0:  # pad
-                r += '                    ' + ' ' * 15 * i
-            r += (' {:14.8f}' * (self.nfunc - i)).format(*self.coefficients[i, i:]) + '\n'
-
-        if self.nfunc == 0:
-            r += '\n'
-
-        return r
+        return render_nonlocal_projector(self)
 
     def __repr__(self):
         return '<NonLocalProjector({}, {})>'.format(self.radius, self.nfunc)
@@ -72,6 +62,28 @@ class NonLocalProjector:
 
         return cls(dset_radius_coefs[0], nfunc, coefs)
 
+    def pack(self) -> Tuple[List[int], numpy.ndarray]:
+        """Pack as `(nfunc, )` and `(radius, coefficients[triu(nfunc)])`"""
+
+        floats = numpy.empty(1 + self.nfunc * (self.nfunc + 1) // 2)
+        floats[0] = self.radius
+        floats[1:] = self.coefficients[numpy.triu_indices(self.nfunc)]
+
+        return [self.nfunc], floats
+
+    @classmethod
+    def unpack(cls, ints: numpy.ndarray, floats: numpy.ndarray) -> 'NonLocalProjector':
+        nfunc = int(ints[0])
+        triu_indices = numpy.triu_indices(nfunc)
+
+        if floats.shape != (len(triu_indices[0]) + 1, ):
+            raise ValueError('non-local projector must contains {} data'.format(len(triu_indices[0]) + 1))
+
+        coefs = numpy.zeros((nfunc, nfunc))
+        coefs[triu_indices] = floats[1:]
+
+        return cls(floats[0], nfunc, coefs)
+
 
 class AtomicPseudopotentialVariant(BaseAtomicVariantDataObject):
     """Atomic GTH (Goedecker-Teter-Hutter) pseudopotential of CP2K
@@ -79,6 +91,8 @@ class AtomicPseudopotentialVariant(BaseAtomicVariantDataObject):
 
     HDF5_DS_RADIUS_COEF = 'local_radius_coefs'
 
+    lazy_attributes = ('lradius', 'lcoefficients', 'nlprojectors')
+
     def __init__(
         self,
         symbol: str,
@@ -97,31 +111,10 @@ class AtomicPseudopotentialVariant(BaseAtomicVariantDataObject):
         self.nlprojectors = nlprojectors
 
     def __str__(self) -> str:
-        r = '# {} [{}|{}]\n'.format(
-            self.symbol,
-            SYMB_TO_Z[self.symbol] - sum(self.nelec),
-            ''.join('{}{}'.format(self.nelec[i], L_TO_SHELL[i]) if self.nelec[i] != 0 else ''
-                    for i in range(len(self.nelec)))
-        )
-
-        if self.source:
-            r += '# SOURCE: {}\n'.format(self.source)
-
-        r += '{}  {}\n{}\n'.format(
-            self.symbol, ' '.join(self.names), ' '.join('{}'.format(x) for x in self.nelec))
-
-        # local part
-        n = self.lcoefficients.shape[0]
-        r += '{:16.8f} {:>3}'.format(self.lradius, n)
-        r += (' {:14.8f}' * n).format(*self.lcoefficients) + '\n'
-
-        # nonlocal part
-        r += '  {:>4}\n'.format(len(self.nlprojectors))
+        if self.text is not None:
+            return self.text
 
-        for proj in self.nlprojectors:
-            r += str(proj)
-
-        return r
+        return render_atomic_pseudopotential_variant(self)
 
     def __repr__(self):
         return '<AtomicPseudopotential({}, {}, {})>'.format(repr(self.symbol), repr(self.names), repr(self.nelec))
@@ -178,6 +171,63 @@ class AtomicPseudopotentialVariant(BaseAtomicVariantDataObject):
 
         return obj
 
+    def pack(self) -> Tuple[List[int], numpy.ndarray]:
+        """Pack as `(len(nelec), nelec[0], ..., len(lcoefficients), len(nlprojectors), nfunc[0], ...)` and
+        `(lradius, lcoefficients[0], ..., radius[0], coefficients[0][triu(nfunc[0])], ...)`
+        """
+
+        ints = [len(self.nelec)]
+        ints.extend(self.nelec)
+        ints.extend([len(self.lcoefficients), len(self.nlprojectors)])
+
+        floats = [[self.lradius], self.lcoefficients]
+
+        for projector in self.nlprojectors:
+            projector_ints, projector_floats = projector.pack()
+            ints.extend(projector_ints)
+            floats.append(projector_floats)
+
+        return ints, numpy.concatenate(floats)
+
+    @classmethod
+    def unpack(
+        cls, symbol: str, names: List[str], ints: numpy.ndarray, floats: numpy.ndarray, source: str = ''
+    ) -> 'AtomicPseudopotentialVariant':
+
+        n = int(ints[0])
+        nelec = ints[1:1 + n].tolist()
+        nlcoefs, nprojectors = ints[1 + n:3 + n].tolist()
+
+        if len(ints) != 3 + n + nprojectors:
+            raise ValueError('packed data of {} do not match its {} projectors'.format(symbol, nprojectors))
+
+        projectors = []
+        floats_position = 1 + nlcoefs
+
+        for i in range(nprojectors):
+            nfunc = int(ints[3 + n + i])
+            floats_end = floats_position + 1 + nfunc * (nfunc + 1) // 2
+            projectors.append(NonLocalProjector.unpack(ints[3 + n + i:4 + n + i], floats[floats_position:floats_end]))
+            floats_position = floats_end
+
+        if floats_position != len(floats):
+            raise ValueError('packed data of {} do not match its {} projectors'.format(symbol, nprojectors))
+
+        return cls(symbol, names, nelec, floats[0], floats[1:1 + nlcoefs], projectors, source=source)
+
+    @classmethod
+    def lazy_unpack(
+        cls,
+        symbol: str,
+        names: List[str],
+        ints: numpy.ndarray,
+        loader: Callable[[], 'AtomicPseudopotentialVariant'],
+        source: str = '',
+        **kwargs
+    ) -> 'AtomicPseudopotentialVariant':
+        return super().lazy_unpack(
+            symbol, names, ints, loader, source, nelec=ints[1:1 + int(ints[0])].tolist(), **kwargs)
+
     def preferred_name(self, family_name: str, variant: str) -> str:
         """Even though they can have multiple name, 'ALL' pseudo should be referred to as `ALL`.
         """
@@ -206,16 +256,27 @@ class PPNotAvail(RuntimeError):
 
 class AtomicPseudopotentialsParser(BaseParser):
 
-    def iter_atomic_pseudopotential_variants(self) -> Iterable[AtomicPseudopotentialVariant]:
+    def iter_data_objects(self, lazy: bool = False) -> Iterable[AtomicPseudopotentialVariant]:
+        return self.iter_atomic_pseudopotential_variants(lazy)
+
+    def data_object(self) -> AtomicPseudopotentialVariant:
+        return self.atomic_pseudopotential_variant()
+
+    def iter_atomic_pseudopotential_variants(self, lazy: bool = False) -> Iterable[AtomicPseudopotentialVariant]:
         """
         ATOMIC_PPs := ATOMIC_PP* EOS
+
+        If `lazy`, the local and nonlocal parts of each pseudopotential are only parsed when first accessed.
         """
 
         self.skip()
 
         while self.current_token.type != TokenType.EOS:
             try:
-                yield self.atomic_pseudopotential_variant()
+                if lazy:
+                    yield self.lazy_atomic_pseudopotential_variant()
+                else:
+                    yield self.atomic_pseudopotential_variant()
             except PPNotAvail as e:
                 l_logger.info('NOT AVAILABLE: {}'.format(e))
                 pass
@@ -224,6 +285,35 @@ class AtomicPseudopotentialsParser(BaseParser):
 
         self.eat(TokenType.EOS)
 
+    def lazy_atomic_pseudopotential_variant(self) -> AtomicPseudopotentialVariant:
+        """Only parse the first two lines of ATOMIC_PP (i.e., symbol, names, and electron per shell)
+        """
+
+        line = self.current_token.line
+        first_line, second_line, loader = self.lazy_record()
+
+        if len(first_line) < 2:
+            raise ParserSyntaxError('expected symbol and names on line {}'.format(line))
+
+        symbol = first_line[0][0].upper() + first_line[0][1:].lower()
+        names = first_line[1:]
+
+        if len(second_line) == 0:
+            raise ParserSyntaxError('expected electron per shell after line {}'.format(line))
+
+        if second_line[0] == 'NA':
+            raise PPNotAvail((symbol, names))
+
+        nelec = []
+        for word in second_line:
+            try:
+                nelec.append(int(word))
+            except ValueError:
+                raise ParserSyntaxError('expected integer, got {}'.format(word))
+
+        return AtomicPseudopotentialVariant.lazy(
+            symbol, names, loader, source=(self.source + '#L{}'.format(line)) if self.source else '', nelec=nelec)
+
     def atomic_pseudopotential_variant(self) -> AtomicPseudopotentialVariant:
         """
         ATOMIC_PP := WORD SPACE WORD (SPACE WORD)* NL INT* NL LOCAL_PART NL NLOCAL_PART
@@ -314,10 +404,10 @@ class AtomicPseudopotentialsParser(BaseParser):
 
         coefficients = numpy.zeros((nfunc, nfunc))
 
-        for i in reversed(range(nfunc)):
+        if nfunc > 0:
+            # upper triangle, row by row
             self.eat(TokenType.SPACE)
-            j = nfunc - i - 1
-            coefficients[j, j:] = self.line('n' * (i + 1))
+            coefficients[numpy.triu_indices(nfunc)] = self.numbers_block(list(range(nfunc, 0, -1)))
 
         self.skip()
 
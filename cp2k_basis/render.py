@@ -0,0 +1,101 @@
+"""
+Render the data objects in the CP2K format.
+
+Rather than formatting each number (or row) on its own, the format of a whole block (e.g., all the rows of a
+contraction) is built once per shape and cached, so that a block is formatted with a single call, using plain python
+floats (which are faster to format than numpy ones, with the same output).
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from cp2k_basis.elements import L_TO_SHELL, SYMB_TO_Z
+
+if TYPE_CHECKING:
+    from cp2k_basis.basis_set import Contraction, AtomicBasisSetVariant
+    from cp2k_basis.pseudopotential import NonLocalProjector, AtomicPseudopotentialVariant
+
+
+@lru_cache(maxsize=None)
+def _contraction_format(nfunc: int, ncoefs: int) -> str:
+    return ('{:>16.12f}' + ' {: .12f}' * ncoefs + '\n') * nfunc
+
+
+@lru_cache(maxsize=None)
+def _triangle_format(nfunc: int) -> str:
+    """Radius, `nfunc`, then the upper triangle of the coefficients, aligned"""
+
+    if nfunc == 0:
+        return '{:16.8f} {:>3}\n'
+
+    return '{:16.8f} {:>3}' + ''.join(
+        (' ' * (20 + 15 * i) if i != 0 else '') + ' {:14.8f}' * (nfunc - i) + '\n' for i in range(nfunc))
+
+
+@lru_cache(maxsize=None)
+def _line_format(n: int) -> str:
+    """Radius, `n`, then `n` coefficients"""
+
+    return '{:16.8f} {:>3}' + ' {:14.8f}' * n + '\n'
+
+
+def render_contraction(contraction: 'Contraction') -> str:
+    head = '{} {} {} {} {}\n'.format(
+        contraction.principle_n,
+        contraction.l_min,
+        contraction.l_max,
+        contraction.nfunc,
+        ' '.join(str(x) for x in contraction.nshell))
+
+    values = []
+    for exponent, coefficients in zip(contraction.exponents.tolist(), contraction.coefficients.tolist()):
+        values.append(exponent)
+        values.extend(coefficients)
+
+    return head + _contraction_format(contraction.nfunc, contraction.coefficients.shape[1]).format(*values)
+
+
+def render_atomic_basis_set_variant(variant: 'AtomicBasisSetVariant') -> str:
+    parts = ['# {} [{}|{}]\n'.format(
+        variant.symbol, variant._representation(False, sep=''), variant._representation(True, sep=''))]
+
+    if variant.source:
+        parts.append('# SOURCE: {}\n'.format(variant.source))
+
+    parts.append('{}  {}\n{}\n'.format(variant.symbol, ' '.join(variant.names), len(variant.contractions)))
+    parts.extend(render_contraction(c) for c in variant.contractions)
+
+    return ''.join(parts)
+
+
+def render_nonlocal_projector(projector: 'NonLocalProjector') -> str:
+    values = [projector.radius, projector.nfunc]
+    for i, row in enumerate(projector.coefficients.tolist()):
+        values.extend(row[i:])
+
+    return _triangle_format(projector.nfunc).format(*values)
+
+
+def render_atomic_pseudopotential_variant(variant: 'AtomicPseudopotentialVariant') -> str:
+    nelec = variant.nelec
+
+    parts = ['# {} [{}|{}]\n'.format(
+        variant.symbol,
+        SYMB_TO_Z[variant.symbol] - sum(nelec),
+        ''.join('{}{}'.format(n, L_TO_SHELL[i]) for i, n in enumerate(nelec) if n != 0)
+    )]
+
+    if variant.source:
+        parts.append('# SOURCE: {}\n'.format(variant.source))
+
+    parts.append('{}  {}\n{}\n'.format(variant.symbol, ' '.join(variant.names), ' '.join(str(x) for x in nelec)))
+
+    # local part
+    parts.append(_line_format(variant.lcoefficients.shape[0]).format(
+        variant.lradius, variant.lcoefficients.shape[0], *variant.lcoefficients.tolist()))
+
+    # nonlocal part
+    parts.append('  {:>4}\n'.format(len(variant.nlprojectors)))
+    parts.extend(render_nonlocal_projector(p) for p in variant.nlprojectors)
+
+    return ''.join(parts)
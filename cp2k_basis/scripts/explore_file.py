@@ -1,5 +1,7 @@
 import argparse
+import contextlib
 import pathlib
+from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple
 
 import yaml
@@ -9,10 +11,17 @@ from cp2k_basis.basis_set import BasisSetsStorage
 from cp2k_basis.pseudopotential import PseudopotentialsStorage
 from cp2k_basis.scripts import SCHEMA_EXPLORE_SOURCE_FILE
 
-from cp2k_basis.scripts.fetch_data import extract_from_file
+from cp2k_basis.scripts.fetch_data import parse_file, store_from_file
 
 
-def explore_file(data_sources: dict, pwd: pathlib.Path = '.') -> Tuple[Storage, Storage]:
+def explore_file(
+        data_sources: dict, pwd: pathlib.Path = '.', jobs: int = 1, lazy: bool = False) -> Tuple[Storage, Storage]:
+    """Read the files of `data_sources`, either in parallel (if `jobs > 1`) or `lazy`-ly, but not both.
+    """
+
+    if lazy and jobs > 1:
+        raise ValueError('cannot parse lazily in parallel')
+
     # validata input
     data_sources = SCHEMA_EXPLORE_SOURCE_FILE.validate(data_sources)
 
@@ -25,12 +34,23 @@ def explore_file(data_sources: dict, pwd: pathlib.Path = '.') -> Tuple[Storage,
     if 'metadata' in data_sources:
         add_metadata = AddMetadata.create(data_sources['metadata'])
 
-    for file_def in data_sources['files']:
-        if file_def.get('disabled', False):
-            continue
+    parsed_files = []
+
+    with ProcessPoolExecutor(jobs) if jobs > 1 else contextlib.nullcontext() as executor:
+        for file_def in data_sources['files']:
+            if file_def.get('disabled', False):
+                continue
+
+            with open(pwd / file_def['name']) as f:
+                if executor is None:
+                    store_from_file(
+                        parse_file(f, file_def, '', pwd, lazy=lazy), file_def, bs_storage, pp_storage, add_metadata)
+                else:
+                    parsed_files.append((file_def, parse_file(f, file_def, '', pwd, executor)))
 
-        with open(pwd / file_def['name']) as f:
-            extract_from_file(f.read(), file_def, bs_storage, pp_storage, '', add_metadata, pwd)
+        # store results, in order
+        for file_def, iterator in parsed_files:
+            store_from_file(iterator, file_def, bs_storage, pp_storage, add_metadata)
 
     return bs_storage, pp_storage
 
@@ -39,13 +59,17 @@ def main():
     parser = argparse.ArgumentParser(description=__doc__)
 
     parser.add_argument('source', type=argparse.FileType('r'))
+    parser.add_argument(
+        '-j', '--jobs', default=1, type=int,
+        help='number of processes used to parse the files (if more than one, the files are then fully parsed)')
 
     args = parser.parse_args()
 
     pwd = pathlib.Path(args.source.name).parent
     data_sources = yaml.load(args.source, Loader=yaml.Loader)
 
-    bs_storage, pp_storage = explore_file(data_sources, pwd)
+    # only names are printed, so there is no need to parse everything (except if parsed in parallel)
+    bs_storage, pp_storage = explore_file(data_sources, pwd, args.jobs, lazy=args.jobs <= 1)
 
     bs_storage.tree()
     pp_storage.tree()
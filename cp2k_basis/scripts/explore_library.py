@@ -17,12 +17,12 @@ def main():
 
     with h5py.File(args.source) as f:
         if 'basis_sets' in f:
-            storage = BasisSetsStorage.read_hdf5(f)
+            storage = BasisSetsStorage.read_hdf5(f, lazy=True)
             storage.tree()
         else:
             print('No `basis_sets` storage')
         if 'pseudopotentials' in f:
-            storage = PseudopotentialsStorage.read_hdf5(f)
+            storage = PseudopotentialsStorage.read_hdf5(f, lazy=True)
             storage.tree()
         else:
             print('No `pseudopotentials` storage')
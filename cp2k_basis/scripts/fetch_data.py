@@ -3,9 +3,11 @@ Fetch the basis sets and pseudopotentials as described in the input, and pack th
 See https://pierre-24.github.io/cp2k-basis/developers/library_build/ for a description of the input, and
 https://pierre-24.github.io/cp2k-basis/developers/library_file_format/ for a description of the output.
 """
+import contextlib
 import datetime
 import pathlib
-from typing import Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Tuple, Iterator
 import diffpatch
 
 import h5py
@@ -16,22 +18,58 @@ import re
 
 from cp2k_basis import logger
 from cp2k_basis.basis_set import AtomicBasisSetsParser, BasisSetsStorage
-from cp2k_basis.base_objects import FilterFirst, FilterUnique, Storage, AddMetadata
+from cp2k_basis.base_objects import FilterFirst, FilterUnique, Storage, AddMetadata, BaseAtomicVariantDataObject
+from cp2k_basis.parser import ParserInput, iter_chunks
 from cp2k_basis.pseudopotential import AtomicPseudopotentialsParser, PseudopotentialsStorage
 from cp2k_basis.scripts import SCHEMA_LIBRARY_SOURCE_FILE
 
 l_logger = logger.getChild('fetch_data')
 
 
-def extract_from_file(
-        content: str,
+def parse_file(
+        content: ParserInput,
+        file_def: dict,
+        base_url: str,
+        pwd: pathlib.Path = pathlib.Path('.'),
+        executor: Executor = None,
+        lazy: bool = False
+) -> Iterator[BaseAtomicVariantDataObject]:
+    """Parse the content of a file (after applying a patch, if any).
+    If `executor` is given, the records of the file are parsed in parallel.
+    Otherwise, they can be parsed `lazy`-ly (see `BaseParser.iter_data_objects()`).
+    """
+
+    # apply patch, if any
+    if 'patch' in file_def:
+        l_logger.info('will apply patch `{}`'.format(file_def['patch']))
+        if not isinstance(content, str):
+            content = ''.join(iter_chunks(content))
+
+        with open(pwd / file_def['patch']) as f:
+            content = diffpatch.apply_patch(content, f.read())
+
+    if file_def['type'] == 'BASIS_SETS':
+        parser_type = AtomicBasisSetsParser
+    else:
+        parser_type = AtomicPseudopotentialsParser
+
+    if executor is None:
+        return parser_type(content, source=base_url + file_def['name']).iter_data_objects(lazy)
+    else:
+        if not isinstance(content, str):
+            content = ''.join(iter_chunks(content))
+
+        return parser_type.iter_data_objects_in_parallel(content, executor, source=base_url + file_def['name'])
+
+
+def store_from_file(
+        iterator: Iterator[BaseAtomicVariantDataObject],
         file_def: dict,
         bs_storage: BasisSetsStorage,
         pp_storage: PseudopotentialsStorage,
-        base_url: str,
-        add_metadata: AddMetadata,
-        pwd: pathlib.Path = pathlib.Path('.')
+        add_metadata: AddMetadata
 ):
+    """Store the objects coming from a file"""
 
     # build the rules for the name
     filter_name = FilterUnique([(re.compile(r'^(.*)$'), '\\1')])
@@ -42,26 +80,31 @@ def extract_from_file(
     if 'variant' in file_def:
         filter_variant = FilterFirst.create(file_def['variant'])
 
-    # apply patch, if any
-    if 'patch' in file_def:
-        l_logger.info('will apply patch `{}`'.format(file_def['patch']))
-        with open(pwd / file_def['patch']) as f:
-            content = diffpatch.apply_patch(content, f.read())
-
-    # fetch data and store them:
+    # store them
     if file_def['type'] == 'BASIS_SETS':
-        iterator = AtomicBasisSetsParser(
-            content, source=base_url + file_def['name']).iter_atomic_basis_set_variants()
         bs_storage.update(iterator, filter_name, filter_variant, add_metadata)
-
-    elif file_def['type'] == 'POTENTIALS':
-        iterator = AtomicPseudopotentialsParser(
-            content, source=base_url + file_def['name']).iter_atomic_pseudopotential_variants()
+    else:
         pp_storage.update(iterator, filter_name, filter_variant, add_metadata)
 
 
-def fetch_data(data_sources: dict, pwd: pathlib.Path = pathlib.Path('.')) -> Tuple[Storage, Storage]:
+def extract_from_file(
+        content: ParserInput,
+        file_def: dict,
+        bs_storage: BasisSetsStorage,
+        pp_storage: PseudopotentialsStorage,
+        base_url: str,
+        add_metadata: AddMetadata,
+        pwd: pathlib.Path = pathlib.Path('.'),
+        executor: Executor = None
+):
+    store_from_file(
+        parse_file(content, file_def, base_url, pwd, executor), file_def, bs_storage, pp_storage, add_metadata)
+
+
+def fetch_data(data_sources: dict, pwd: pathlib.Path = pathlib.Path('.'), jobs: int = 1) -> Tuple[Storage, Storage]:
     """Fetch data from files that are found in repositories.
+
+    If `jobs > 1`, files are parsed in parallel, in a pool of `jobs` processes, while the next ones are downloaded.
     """
 
     data_sources = SCHEMA_LIBRARY_SOURCE_FILE.validate(data_sources)
@@ -75,24 +118,36 @@ def fetch_data(data_sources: dict, pwd: pathlib.Path = pathlib.Path('.')) -> Tup
     if 'metadata' in data_sources:
         add_metadata = AddMetadata.create(data_sources['metadata'])
 
-    # fetch files
-    for data_source in data_sources['repositories']:
-        if 'data' in data_source:
-            base_url = data_source['base'].format(**data_source['data'])
-        else:
-            base_url = data_source['base']
-
-        for file_def in data_source['files']:
-            if file_def.get('disabled', False):
-                continue
-
-            full_url = base_url + file_def['name']
-            l_logger.info('fetch {} [{}]'.format(full_url, file_def['type']))
-
-            response = requests.get(full_url)
-
-            extract_from_file(
-                response.content.decode('utf8'), file_def, bs_storage, pp_storage, base_url, add_metadata, pwd)
+    parsed_files = []
+
+    with ProcessPoolExecutor(jobs) if jobs > 1 else contextlib.nullcontext() as executor:
+        # fetch files
+        for data_source in data_sources['repositories']:
+            if 'data' in data_source:
+                base_url = data_source['base'].format(**data_source['data'])
+            else:
+                base_url = data_source['base']
+
+            for file_def in data_source['files']:
+                if file_def.get('disabled', False):
+                    continue
+
+                full_url = base_url + file_def['name']
+                l_logger.info('fetch {} [{}]'.format(full_url, file_def['type']))
+
+                if executor is None:
+                    # parse the content while it is downloaded
+                    with requests.get(full_url, stream=True) as response:
+                        response.raw.decode_content = True
+                        extract_from_file(response.raw, file_def, bs_storage, pp_storage, base_url, add_metadata, pwd)
+                else:
+                    response = requests.get(full_url)
+                    parsed_files.append(
+                        (file_def, parse_file(response.content.decode('utf8'), file_def, base_url, pwd, executor)))
+
+        # store results, in order
+        for file_def, iterator in parsed_files:
+            store_from_file(iterator, file_def, bs_storage, pp_storage, add_metadata)
 
     return bs_storage, pp_storage
 
@@ -102,6 +157,9 @@ def main():
 
     parser.add_argument('source', type=argparse.FileType('r'))
     parser.add_argument('-o', '--output', default='library.h5', type=pathlib.Path)
+    parser.add_argument('-j', '--jobs', default=1, type=int, help='number of processes used to parse the files')
+    parser.add_argument(
+        '-t', '--with-text', action='store_true', help='also store the rendered text (and preferred names) of variants')
 
     args = parser.parse_args()
 
@@ -110,7 +168,7 @@ def main():
     # load data
     l_logger.info('reading {}'.format(args.source.name))
     data_sources = yaml.load(args.source, yaml.Loader)
-    bs_storage, pp_storage = fetch_data(data_sources, pwd)
+    bs_storage, pp_storage = fetch_data(data_sources, pwd, args.jobs)
 
     bs_storage.tree()
     pp_storage.tree()
@@ -118,9 +176,9 @@ def main():
     # write library
     l_logger.info('writing in {}'.format(args.output))
     with h5py.File(args.output, 'w') as f:
-        f.attrs['date_build'] = datetime.datetime.now().isoformat()
-        bs_storage.dump_hdf5(f)
-        pp_storage.dump_hdf5(f)
+        f.attrs['date_build'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        bs_storage.dump_hdf5(f, with_text=args.with_text)
+        pp_storage.dump_hdf5(f, with_text=args.with_text)
 
 
 if __name__ == '__main__':
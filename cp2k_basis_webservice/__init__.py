@@ -3,16 +3,12 @@ This website provides an equivalent to the famous basis set exchange for the bas
 used in the CP2K program.
 """
 
-import pathlib
-
-import h5py
 from flask import Flask
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 import cp2k_basis
-from cp2k_basis.basis_set import BasisSetsStorage
-from cp2k_basis.pseudopotential import PseudopotentialsStorage
+from cp2k_basis_webservice.library import LibraryReloader, load_library, pin_library
 
 
 COMMON_CONTEXT = dict(
@@ -39,25 +35,34 @@ class Config:
     # API
     API_LIMIT = '10/second'
 
+    # keep the rendered data of the most requested families (`None` means no limit)
+    CACHE_RESPONSES = True
+    RESPONSE_CACHE_MAX_ENTRIES = None
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
     # library
     LIBRARY = 'instance/library.h5'
+    LIBRARY_LAZY = True  # only read the variants of a family when first requested
 
-    # to be filled by `load_library()`
-    BASIS_SETS_STORAGE = None
-    PSEUDOPOTENTIALS_STORAGE = None
+    # if `LIBRARY_LAZY`, only keep the variants of the most recently requested families (`None` means no limit)
+    LIBRARY_CACHE_MAX_FAMILIES = None
+    LIBRARY_CACHE_MAX_BYTES = None
 
+    # when served with `cp2k_basis_webservice.asgi`, number of threads to compute the responses, and maximum number
+    # of requests handed to them at once (until their response is sent)
+    ASYNC_MAX_WORKERS = 8
+    ASYNC_MAX_PENDING = 64
 
-def load_library(app: Flask):
-    path = pathlib.Path(app.config['LIBRARY'])
-    if not path.exists():
-        raise FileNotFoundError('Library file `{}` does not exists'.format(path))
+    # if set, check the library file every `LIBRARY_WATCH_INTERVAL` seconds, and reload it if it changed
+    LIBRARY_WATCH_INTERVAL = None
 
-    with h5py.File(path) as f:
-        bs_storage = BasisSetsStorage.read_hdf5(f)
-        pp_storage = PseudopotentialsStorage.read_hdf5(f)
+    # if set, the library can be reloaded with `POST /api/reload`, with `Authorization: Bearer <RELOAD_TOKEN>`
+    RELOAD_TOKEN = None
 
-    app.config['BASIS_SETS_STORAGE'] = bs_storage
-    app.config['PSEUDOPOTENTIALS_STORAGE'] = pp_storage
+    # to be filled by `load_library()` (`LOADED_LIBRARY` is a `Library`)
+    LOADED_LIBRARY = None
+    BASIS_SETS_STORAGE = None
+    PSEUDOPOTENTIALS_STORAGE = None
 
 
 def create_app(instance_relative_config=True):
@@ -70,8 +75,15 @@ def create_app(instance_relative_config=True):
     # add other modules
     limiter.init_app(app)
 
-    # load library
+    # load library (and reload it when needed)
     load_library(app)
+    app.before_request(pin_library)
+
+    reloader = LibraryReloader(app)
+    app.extensions['library_reloader'] = reloader
+
+    if app.config['LIBRARY_WATCH_INTERVAL']:
+        reloader.watch(app.config['LIBRARY_WATCH_INTERVAL'])
 
     # add blueprint(s)
     from cp2k_basis_webservice.blueprints import visitor_blueprint, api_blueprint
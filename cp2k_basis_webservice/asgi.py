@@ -0,0 +1,214 @@
+import asyncio
+import io
+import sys
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+
+
+class ASGIApp:
+    """Serve a (Flask) webservice app with an ASGI server, e.g.,
+    `uvicorn --factory cp2k_basis_webservice.asgi:create_asgi_app`.
+
+    The connections (reading the requests and sending the responses, including to slow clients) are handled by the
+    event loop, while the responses themselves are computed by the views of `app` (which may need to read the
+    library file) in a bounded pool of `max_workers` threads.
+    Streamed responses are sent chunk by chunk, as they are produced, and at most `MAX_QUEUED_MESSAGES` of them
+    wait to be sent: the worker then waits for the client.
+    At most `max_pending` requests are handed to the pool at once (until their response is sent), the others wait in
+    the event loop.
+    Since it is the same app, the library, caches, etc. are shared with it.
+    """
+
+    # messages of a response that may be produced ahead of the client
+    MAX_QUEUED_MESSAGES = 4
+
+    def __init__(self, app: Flask, max_workers: int = 8, max_pending: int = 64):
+        self.app = app
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi-worker')
+        self._pending: asyncio.Semaphore = None
+
+    async def __call__(self, scope: Scope, receive: Callable, send: Callable):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(scope, receive, send)
+        else:
+            raise ValueError('unsupported scope type {}'.format(scope['type']))
+
+    async def handle_lifespan(self, scope: Scope, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+        reloader = self.app.extensions.get('library_reloader', None)
+        if reloader is not None:
+            reloader.stop()
+
+    async def handle_http(self, scope: Scope, receive: Callable, send: Callable):
+        body = b''
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                break
+
+        # (created here, so that it belongs to the loop of the server)
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue(maxsize=self.MAX_QUEUED_MESSAGES)
+        cancelled = threading.Event()
+
+        def put(message: Message):
+            # (blocks the worker until there is room, so that a slow client slows down the production)
+            asyncio.run_coroutine_threadsafe(messages.put(message), loop).result()
+
+        # (released once the response is sent, so that it bounds the data in flight)
+        await self._pending.acquire()
+
+        try:
+            future = loop.run_in_executor(self.executor, self.call_app, self.environ(scope, body), put, cancelled)
+
+            # the messages are sent as soon as they are produced, until the end (`None`)
+            try:
+                while True:
+                    message = await messages.get()
+                    if message is None:
+                        break
+
+                    await send(message)
+            except BaseException:
+                cancelled.set()
+
+                # let the worker put its last messages, then stop
+                while await messages.get() is not None:
+                    pass
+
+                raise
+            finally:
+                await future
+        finally:
+            self._pending.release()
+
+    def environ(self, scope: Scope, body: bytes) -> Dict[str, Any]:
+        """Translate `scope` (see the ASGI specification) into a WSGI environ (PEP 3333)"""
+
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+
+            if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+                environ[name] = value
+            else:
+                key = 'HTTP_{}'.format(name)
+                environ[key] = '{},{}'.format(environ[key], value) if key in environ else value
+
+        return environ
+
+    def call_app(self, environ: Dict[str, Any], put: Callable[[Optional[Message]], None], cancelled: threading.Event):
+        """Call the (WSGI) app, in a worker thread, and `put()` the response messages as the body is produced.
+        The end is signaled by `None`.
+        """
+
+        response_start = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            response_start[:] = [status, headers]
+
+        def put_start():
+            status, headers = response_start
+            put({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            })
+
+        try:
+            iterable = self.app.wsgi_app(environ, start_response)
+
+            try:
+                # one chunk is kept, so that the last one is sent with `more_body=False`
+                previous = None
+                for chunk in iterable:
+                    if not chunk:
+                        continue
+
+                    if previous is None:
+                        put_start()
+                    else:
+                        put({'type': 'http.response.body', 'body': previous, 'more_body': True})
+
+                    if cancelled.is_set():
+                        return
+
+                    previous = chunk
+
+                if previous is None:
+                    put_start()
+
+                put({'type': 'http.response.body', 'body': previous or b'', 'more_body': False})
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            put(None)
+
+
+def create_asgi_app(app: Flask = None, max_workers: int = None, max_pending: int = None) -> ASGIApp:
+    """Create an ASGI app, for `app` (or a new one, see `create_app()`).
+    The bounds are given by `ASYNC_MAX_WORKERS` and `ASYNC_MAX_PENDING`, if not set.
+    """
+
+    if app is None:
+        from cp2k_basis_webservice import create_app
+        app = create_app()
+
+    return ASGIApp(
+        app,
+        max_workers if max_workers is not None else app.config['ASYNC_MAX_WORKERS'],
+        max_pending if max_pending is not None else app.config['ASYNC_MAX_PENDING']
+    )
@@ -1,17 +1,25 @@
 import datetime
+import hashlib
+import hmac
 import json
 
+from typing import Iterable, List, Optional
+
 import flask
 from flask.views import MethodView
 from flask.blueprints import Blueprint
-from werkzeug.exceptions import NotFound
+from werkzeug.exceptions import Forbidden, NotFound
 
-from webargs import fields
+from marshmallow import EXCLUDE, Schema, ValidationError
+from webargs import fields, validate
 from webargs.flaskparser import FlaskParser
 
-from cp2k_basis.elements import ElementSetField, Z_TO_SYMB
-from cp2k_basis.base_objects import Storage
+from cp2k_basis.cache import LRUCache
+from cp2k_basis.elements import ElementSet, ElementSetField, SYMB_TO_Z, Z_TO_SYMB
+from cp2k_basis.base_objects import BaseAtomicDataObject, BaseFamilyStorage, Storage
 from cp2k_basis_webservice import limiter, Config
+from cp2k_basis_webservice.library import build_datetime, get_library
+from cp2k_basis_webservice.responses import RenderedResponse
 
 
 class RenderTemplateView(MethodView):
@@ -31,32 +39,133 @@ class RenderTemplateView(MethodView):
         return flask.render_template(self.template_name, **context_data)
 
 
-# ----
-visitor_blueprint = Blueprint('visitor', __name__)
+# responses which change between requests, and thus are never conditional
+NOT_CONDITIONAL_ENDPOINTS = {'api.stats'}
 
+# routes to a family: source, and whether the `elements` must be defined in the family
+FAMILY_ENDPOINTS = {
+    'api.basis-data': ('BASIS_SET', True),
+    'api.basis-raw': ('BASIS_SET', True),
+    'api.basis-metadata': ('BASIS_SET', False),
+    'api.pseudo-data': ('PSEUDOPOTENTIAL', True),
+    'api.pseudo-raw': ('PSEUDOPOTENTIAL', True),
+    'api.pseudo-metadata': ('PSEUDOPOTENTIAL', False),
+}
 
-class IndexView(RenderTemplateView):
-    template_name = 'index.html'
+# routes whose data contain a header (if `header`, the default), which changes between requests (`# FETCHED`)
+HEADER_ENDPOINTS = {'api.basis-data', 'api.basis-raw', 'api.pseudo-data', 'api.pseudo-raw'}
 
-    def __init__(self):
-        super().__init__()
+# query parameters which, if invalid, lead to an error (422) rather than to the response
+_query_schema = Schema.from_dict({'elements': ElementSetField(), 'header': fields.Bool()})(unknown=EXCLUDE)
 
-        self.bs_storage = flask.current_app.config['BASIS_SETS_STORAGE']
-        self.pp_storage = flask.current_app.config['PSEUDOPOTENTIALS_STORAGE']
 
-        # separate orb and aux basis sets
-        self.orb_basis = {'elements': {}, 'tags': {}}
-        self.aux_basis = {'elements': {}, 'tags': {}, 'type': {}}
+def _is_conditional() -> bool:
+    return flask.request.method in ('GET', 'HEAD') and flask.request.endpoint not in NOT_CONDITIONAL_ENDPOINTS
 
-        for name in self.bs_storage:
-            if self.bs_storage[name].metadata.get('basis_type', 'ORB') != 'ORB':
-                b = self.aux_basis
-                b['type'][name] = self.bs_storage[name].metadata.get('basis_type', 'ORB')
-            else:
-                b = self.orb_basis
 
-            b['elements'][name] = self.bs_storage.elements_per_family[name]
-            b['tags'][name] = self.bs_storage.tags_per_family[name]
+def _query_args() -> Optional[dict]:
+    """Query parameters, or `None` if they are invalid"""
+
+    try:
+        return _query_schema.load(flask.request.args.to_dict())
+    except ValidationError:
+        return None
+
+
+def _is_found(args: dict) -> bool:
+    """Check that the response would be successful, i.e., that the family exists and that the elements are defined
+    in it, without rendering it (nor loading the family)
+    """
+
+    if flask.request.endpoint not in FAMILY_ENDPOINTS:
+        return True
+
+    source, check_elements = FAMILY_ENDPOINTS[flask.request.endpoint]
+    storage: Storage = get_library().storage(source)
+    name = flask.request.view_args['name']
+
+    if name not in storage:
+        return False
+
+    elements = args.get('elements', None)
+    if check_elements and elements and not elements <= storage.element_sets_per_family[name]:
+        return False
+
+    return True
+
+
+def _is_weak(args: dict) -> bool:
+    """The data with a header are not identical from one request to the other, only equivalent"""
+
+    return flask.request.endpoint in HEADER_ENDPOINTS and args.get('header', True)
+
+
+def _etag() -> str:
+    """The responses only depend on the library, the path and the query parameters"""
+
+    return hashlib.sha256('{}\n{}\n{}'.format(
+        get_library().hash,
+        flask.request.path,
+        sorted(flask.request.args.items(multi=True))
+    ).encode()).hexdigest()
+
+
+def conditional_response():
+    """Answer with 304 if the client already has the response, before it is rendered.
+    `If-None-Match` is checked against the ETag, or, if not given, `If-Modified-Since` against the build date
+    of the library.
+    Requests which would not be successful (e.g., for a family that does not exist) are left to the view.
+    """
+
+    if not _is_conditional() or not (flask.request.if_none_match or flask.request.if_modified_since):
+        return None
+
+    args = _query_args()
+    if args is None or not _is_found(args):
+        return None
+
+    last_modified = get_library().last_modified
+    etag = _etag()
+
+    if flask.request.if_none_match:
+        # (a compressed response has its own ETag, see `add_validators()`)
+        not_modified = False
+        for etag_encoding in [etag, etag + '-gzip', etag + '-br']:
+            if flask.request.if_none_match.contains_weak(etag_encoding):
+                etag = etag_encoding
+                not_modified = True
+                break
+    else:
+        not_modified = last_modified is not None and flask.request.if_modified_since is not None \
+            and last_modified <= flask.request.if_modified_since
+
+    if not_modified:
+        response = flask.current_app.response_class(status=304)
+        response.set_etag(etag, weak=_is_weak(args))
+        response.last_modified = last_modified
+        return response
+
+
+def add_validators(response: flask.Response) -> flask.Response:
+    """Add `ETag` (weak, if the data contain a header) and `Last-Modified` to successful responses"""
+
+    if response.status_code == 200 and _is_conditional():
+        encoding = response.headers.get('Content-Encoding', None)
+        response.set_etag(
+            _etag() + ('-{}'.format(encoding) if encoding else ''), weak=_is_weak(_query_args() or {}))
+        response.last_modified = get_library().last_modified
+
+    return response
+
+
+# ----
+visitor_blueprint = Blueprint('visitor', __name__)
+visitor_blueprint.before_request(conditional_response)
+visitor_blueprint.after_request(add_validators)
+
+
+class IndexView(RenderTemplateView):
+    template_name = 'index.html'
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -64,28 +173,52 @@ class IndexView(RenderTemplateView):
         from cp2k_basis_webservice import COMMON_CONTEXT
         ctx.update(**COMMON_CONTEXT)
 
-        aux_basis = []
-        for name in flask.current_app.config['BASIS_SETS_STORAGE']:
-            if self.bs_storage[name].metadata.get('basis_type', 'ORB') != 'ORB':
-                aux_basis.append(name)
+        bs_storage: Storage = get_library().basis_sets_storage
+        pp_storage: Storage = get_library().pseudopotentials_storage
+
+        # separate orb and aux basis sets
+        orb_basis = {'elements': {}, 'tags': {}}
+        aux_basis = {'elements': {}, 'tags': {}, 'type': {}}
+
+        for name in bs_storage:
+            basis_type = bs_storage.get_metadata(name).get('basis_type', 'ORB')
+            if basis_type != 'ORB':
+                b = aux_basis
+                b['type'][name] = basis_type
+            else:
+                b = orb_basis
+
+            b['elements'][name] = bs_storage.elements_per_family[name]
+            b['tags'][name] = bs_storage.tags_per_family[name]
 
         ctx.update(
             z_to_symb=Z_TO_SYMB,
-            orb_basis_sets=self.orb_basis,
-            aux_basis_sets=self.aux_basis,
+            orb_basis_sets=orb_basis,
+            aux_basis_sets=aux_basis,
             pseudopotentials=dict(
-                elements=json.dumps(self.pp_storage.elements_per_family),
-                tags=json.dumps(self.pp_storage.tags_per_family),
+                elements=json.dumps(pp_storage.elements_per_family),
+                tags=json.dumps(pp_storage.tags_per_family),
             )
         )
 
         return ctx
 
+    def get(self, **kwargs):
+        """Handle GET: the page only depends on the library, so it is rendered once per `Library`"""
+
+        library = get_library()
+        if library.index_page is None:
+            library.index_page = RenderedResponse(super().get(**kwargs), mimetype='text/html')
+
+        return library.index_page.response()
+
 
 visitor_blueprint.add_url_rule('/', view_func=IndexView.as_view(name='index'))
 
 # ----
 api_blueprint = Blueprint('api', __name__, url_prefix='/api')
+api_blueprint.before_request(conditional_response)
+api_blueprint.after_request(add_validators)
 
 
 @api_blueprint.errorhandler(422)
@@ -99,6 +232,7 @@ def handle_error(err):
         return flask.jsonify(data), err.code
 
 
+@api_blueprint.errorhandler(400)
 @api_blueprint.errorhandler(401)
 @api_blueprint.errorhandler(403)
 @api_blueprint.errorhandler(404)
@@ -111,15 +245,39 @@ field_name = fields.Str()
 
 parser = FlaskParser()
 
+# stands for `result.data` while rendering a response (see `BaseFamilyStorageDataAPI.render()`)
+_DATA_MARKER = '\0data\0'
+
+TPL_DATETIME = '%d/%m/%Y @ %H:%M'
+
+
+def data_header(url: str, storage: Storage) -> str:
+    """Header of the data (as comments), which is added per request"""
+
+    return '# URL: {}\n# BUILD: {}\n# FETCHED: {}\n# ---\n'.format(
+        url,
+        build_datetime(storage.date_build).astimezone().strftime(TPL_DATETIME) if storage.date_build else '?',
+        datetime.datetime.now().strftime(TPL_DATETIME),
+    )
+
 
 class AllDataAPI(MethodView):
     decorators = [limiter.limit(Config.API_LIMIT)]
 
     def get(self, **kwargs):
-        bs_storage: Storage = flask.current_app.config['BASIS_SETS_STORAGE']
-        pp_storage: Storage = flask.current_app.config['PSEUDOPOTENTIALS_STORAGE']
+        """Handle GET: the response only depends on the library, so it is rendered once per `Library`"""
 
-        return flask.jsonify(
+        library = get_library()
+        if library.data_response is None:
+            library.data_response = self.render()
+
+        return library.data_response.response()
+
+    def render(self) -> RenderedResponse:
+        bs_storage: Storage = get_library().basis_sets_storage
+        pp_storage: Storage = get_library().pseudopotentials_storage
+
+        response = flask.jsonify(
             query=dict(type='ALL'),
             result=dict(
                 basis_sets=dict(
@@ -135,6 +293,8 @@ class AllDataAPI(MethodView):
             )
         )
 
+        return RenderedResponse(response.get_data(as_text=True), mimetype=response.mimetype)
+
 
 api_blueprint.add_url_rule('/data', view_func=AllDataAPI.as_view(name='data'))
 
@@ -148,8 +308,8 @@ class NamesAPI(MethodView):
         'pp_tag': fields.Str()
     }, location='query')
     def get(self, **kwargs):
-        bs_storage: Storage = flask.current_app.config['BASIS_SETS_STORAGE']
-        pp_storage: Storage = flask.current_app.config['PSEUDOPOTENTIALS_STORAGE']
+        bs_storage: Storage = get_library().basis_sets_storage
+        pp_storage: Storage = get_library().pseudopotentials_storage
 
         elements = kwargs.get('elements', None)
         bs_name = kwargs.get('bs_name', None)
@@ -174,6 +334,64 @@ class NamesAPI(MethodView):
 api_blueprint.add_url_rule('/names', view_func=NamesAPI.as_view(name='names'))
 
 
+class StatsAPI(MethodView):
+    decorators = [limiter.limit(Config.API_LIMIT)]
+
+    def get(self, **kwargs):
+        library = get_library()
+        bs_storage: Storage = library.basis_sets_storage
+        pp_storage: Storage = library.pseudopotentials_storage
+        response_cache: LRUCache = library.response_cache
+
+        return flask.jsonify(
+            query=dict(type='STATS'),
+            result=dict(
+                families=dict(
+                    basis_sets=bs_storage.family_cache.stats() if bs_storage.family_cache is not None else None,
+                    pseudopotentials=pp_storage.family_cache.stats() if pp_storage.family_cache is not None else None
+                ),
+                responses=response_cache.stats() if response_cache is not None else None,
+                library=dict(**library.stats(), **flask.current_app.extensions['library_reloader'].stats())
+            )
+        )
+
+
+api_blueprint.add_url_rule('/stats', view_func=StatsAPI.as_view(name='stats'))
+
+
+class ReloadAPI(MethodView):
+    methods = ['POST']
+
+    @parser.use_kwargs({'wait': fields.Bool()}, location='query')
+    def post(self, **kwargs):
+        """Reload the library in the background (or wait for it, if `wait`).
+        Only available if `RELOAD_TOKEN` is set, and must be given as `Authorization: Bearer <RELOAD_TOKEN>`.
+        """
+
+        token = flask.current_app.config['RELOAD_TOKEN']
+        if not token:
+            raise NotFound('reload is disabled')
+
+        authorization = flask.request.authorization
+        if authorization is None or authorization.type != 'bearer' \
+                or not hmac.compare_digest(authorization.token or '', token):
+            raise Forbidden('invalid token')
+
+        wait = kwargs.get('wait', False)
+        reloader = flask.current_app.extensions['library_reloader']
+        reloader.reload(wait=wait)
+
+        library = flask.current_app.config['LOADED_LIBRARY']
+
+        return flask.jsonify(
+            query=dict(type='RELOAD', wait=wait),
+            result=dict(**library.stats(), **reloader.stats())
+        ), 200 if wait else 202
+
+
+api_blueprint.add_url_rule('/reload', view_func=ReloadAPI.as_view(name='reload'))
+
+
 class BaseFamilyStorageDataAPI(MethodView):
     decorators = [limiter.limit(Config.API_LIMIT)]
     source: str = ''
@@ -182,47 +400,75 @@ class BaseFamilyStorageDataAPI(MethodView):
     @parser.use_kwargs({'name': field_name}, location='view_args')
     @parser.use_kwargs({'elements': field_elements, 'header': fields.Bool()}, location='query')
     def get(self, **kwargs):
-        storage: Storage = flask.current_app.config['{}S_STORAGE'.format(self.source)]
+        storage: Storage = get_library().storage(self.source)
 
         elements = kwargs.get('elements', None)
         name = kwargs.get('name')
 
+        # the response is rendered once per family and set of elements, only the header is added per request
+        cache: LRUCache = get_library().response_cache
+        key = (self.source, name, elements.mask if elements else 0)
+
+        rendered = cache.get(key) if cache is not None else None
+        if rendered is None:
+            rendered = self.render(storage, name, elements)
+            if cache is not None:
+                cache.put(key, rendered, rendered.estimated_size())
+
+        header = ''
+        if kwargs.get('header', True):
+            header = data_header(self.url('data', name, elements), storage)
+
+        return rendered.response(flask.current_app.json.dumps(header)[1:-1])
+
+    def url(self, route: str, name: str, elements: ElementSet = None) -> str:
+        """URL of `route` (`data` or `raw`) for this family, as given in the header"""
+
+        return flask.url_for(
+            'api.{}-{}'.format('basis' if self.source == 'BASIS_SET' else 'pseudo', route),
+            name=name,
+            _external=True
+        ) + ('?elements={}'.format(','.join(elements.iter_sorted())) if elements else '')
+
+    @classmethod
+    def get_family(cls, storage: Storage, name: str) -> BaseFamilyStorage:
         try:
-            family_storage = storage[name]
+            return storage[name]
         except KeyError:
-            raise NotFound('{} `{}` does not exist'.format(self.textual_source, name))
+            raise NotFound('{} `{}` does not exist'.format(cls.textual_source, name))
+
+    @classmethod
+    def get_atomic_data_object(cls, family_storage: BaseFamilyStorage, symbol: str) -> BaseAtomicDataObject:
+        try:
+            return family_storage[symbol]
+        except KeyError:
+            raise NotFound('{} `{}` does not exist for atom {}'.format(cls.textual_source, family_storage.name, symbol))
+
+    @classmethod
+    def get_atomic_data_objects(
+            cls, family_storage: BaseFamilyStorage, elements: ElementSet = None) -> List[BaseAtomicDataObject]:
+        """Get the atomic data objects for `elements` (or all of them, if not given)"""
 
         if not elements:
-            atomic_data_objects = list(family_storage.values())
+            return list(family_storage.values())
         else:
-            atomic_data_objects = []
-            for symbol in elements.iter_sorted():
-                try:
-                    atomic_data_objects.append(family_storage[symbol])
-                except KeyError:
-                    raise NotFound('{} `{}` does not exist for atom {}'.format(self.textual_source, name, symbol))
+            return list(cls.get_atomic_data_object(family_storage, symbol) for symbol in elements.iter_sorted())
 
-        header = ''
-        TPL_DATETIME = '%d/%m/%Y @ %H:%M'
+    def render(self, storage: Storage, name: str, elements: ElementSet = None) -> RenderedResponse:
+        """Render the response (as `flask.jsonify()` would), split where the header should be inserted, i.e., at
+        the beginning of `result.data`
+        """
 
-        if kwargs.get('header', True):
-            header = '# URL: {}\n# BUILD: {}\n# FETCHED: {}\n# ---\n'.format(
-                flask.url_for(
-                    'api.{}-data'.format('basis' if self.source == 'BASIS_SET' else 'pseudo'),
-                    name=name,
-                    _external=True
-                ) + ('?elements={}'.format(','.join(elements.iter_sorted())) if elements else ''),
-                datetime.datetime.fromisoformat(storage.date_build).strftime('%d/%m/%Y @ %H:%M') if storage.date_build else '?',  # noqa
-                datetime.datetime.now().strftime(TPL_DATETIME),
-            )
+        family_storage = self.get_family(storage, name)
+        atomic_data_objects = self.get_atomic_data_objects(family_storage, elements)
 
         variants = {}
         for obj in atomic_data_objects:
-            variants[obj.symbol] = dict((v, obj[v].preferred_name(name, v)) for v in obj)
+            variants[obj.symbol] = dict((v, family_storage.preferred_name(obj.symbol, v)) for v in obj)
 
         query = dict(type=self.source, name=name)
         result = dict(
-            data=header + ''.join(str(obj) for obj in atomic_data_objects),
+            data=_DATA_MARKER,
             elements=list(obj.symbol for obj in atomic_data_objects),
             variants=variants,
             metadata=family_storage.metadata
@@ -231,10 +477,13 @@ class BaseFamilyStorageDataAPI(MethodView):
         if elements:
             query['elements'] = list(elements.iter_sorted())
 
-        return flask.jsonify(
-            query=query,
-            result=result
-        )
+        json_provider = flask.current_app.json
+        data = ''.join(str(obj) for obj in atomic_data_objects)
+
+        head, rest = json_provider.response(query=query, result=result).get_data(as_text=True).split(
+            json_provider.dumps(_DATA_MARKER)[1:-1], 1)
+
+        return RenderedResponse(head, json_provider.dumps(data)[1:-1] + rest, json_provider.mimetype)
 
 
 class BasisSetDataAPI(BaseFamilyStorageDataAPI):
@@ -254,6 +503,173 @@ api_blueprint.add_url_rule(
     '/pseudopotentials/<name>/data', view_func=PseudopotentialDataAPI.as_view(name='pseudo-data'))
 
 
+class BaseFamilyStorageRawAPI(BaseFamilyStorageDataAPI):
+    """The data only, as plain text (CP2K format).
+    The response is streamed, one atomic variant at a time, so it is never held as a whole.
+    """
+
+    @parser.use_kwargs({'name': field_name}, location='view_args')
+    @parser.use_kwargs({'elements': field_elements, 'header': fields.Bool()}, location='query')
+    def get(self, **kwargs):
+        storage: Storage = get_library().storage(self.source)
+
+        elements = kwargs.get('elements', None)
+        name = kwargs.get('name')
+
+        # (any 404 is raised before the response starts)
+        atomic_data_objects = self.get_atomic_data_objects(self.get_family(storage, name), elements)
+
+        header = ''
+        if kwargs.get('header', True):
+            header = data_header(self.url('raw', name, elements), storage)
+
+        def generate() -> Iterable[str]:
+            if header:
+                yield header
+
+            for obj in atomic_data_objects:
+                for variant_obj in obj.values():
+                    yield str(variant_obj)
+
+        return flask.current_app.response_class(flask.stream_with_context(generate()), mimetype='text/plain')
+
+
+class BasisSetRawAPI(BaseFamilyStorageRawAPI):
+    source = 'BASIS_SET'
+    textual_source = 'basis set'
+
+
+api_blueprint.add_url_rule('/basis/<name>/raw', view_func=BasisSetRawAPI.as_view(name='basis-raw'))
+
+
+class PseudopotentialRawAPI(BaseFamilyStorageRawAPI):
+    source = 'PSEUDOPOTENTIAL'
+    textual_source = 'pseudopotential'
+
+
+api_blueprint.add_url_rule(
+    '/pseudopotentials/<name>/raw', view_func=PseudopotentialRawAPI.as_view(name='pseudo-raw'))
+
+
+# maximum number of kinds in a batch
+MAX_BATCH_KINDS = 256
+
+
+def _validate_symbol(symbol: str):
+    if symbol not in SYMB_TO_Z:
+        raise ValidationError('`{}` is not a valid element'.format(symbol))
+
+
+def _validate_kinds(args: dict):
+    for kind in args['kinds']:
+        if 'basis_set' not in kind and 'pseudopotential' not in kind:
+            raise ValidationError(
+                'kind {} requires a basis set, a pseudopotential, or both'.format(kind['element']))
+
+
+def _variant_key(variant: str) -> tuple:
+    """Sort the variants by number of valence electrons (e.g., `q11` > `q3`), if any"""
+
+    return (int(variant[1:]) if variant[:1] == 'q' and variant[1:].isdigit() else -1, variant)
+
+
+class BatchAPI(MethodView):
+    decorators = [limiter.limit(Config.API_LIMIT)]
+    methods = ['POST']
+
+    sources = [
+        ('basis_set', BasisSetDataAPI),
+        ('pseudopotential', PseudopotentialDataAPI)
+    ]
+
+    @parser.use_kwargs({
+        'kinds': fields.List(fields.Nested({
+            'element': fields.Str(required=True, validate=_validate_symbol),
+            'basis_set': field_name,
+            'pseudopotential': field_name,
+            'variant': fields.Str()
+        }), required=True, validate=validate.Length(min=1, max=MAX_BATCH_KINDS)),
+        'header': fields.Bool()
+    }, location='json', validate=_validate_kinds)
+    def post(self, **kwargs):
+        """Resolve a list of kinds, each being an element with a basis set and/or a pseudopotential family, and
+        (optionally) a variant.
+        If the variant is not given, the largest one which is common to both families is used.
+
+        Return the data of all the kinds at once (each atomic variant is only given once), and the corresponding
+        `&KIND` sections.
+        """
+
+        library = get_library()
+
+        data = dict((key, []) for key, _ in self.sources)
+        seen = set()
+        kinds = []
+
+        for kind in kwargs['kinds']:
+            symbol = kind['element']
+
+            atomic_data_objects = []
+            for key, api in self.sources:
+                if key in kind:
+                    family_storage = api.get_family(library.storage(api.source), kind[key])
+                    atomic_data_objects.append(
+                        (key, api, family_storage, api.get_atomic_data_object(family_storage, symbol)))
+
+            if 'variant' in kind:
+                variant = kind['variant']
+                for _, api, family_storage, obj in atomic_data_objects:
+                    if variant not in obj:
+                        raise NotFound('{} `{}` has no variant {} for atom {}'.format(
+                            api.textual_source, family_storage.name, variant, symbol))
+            else:
+                variants = set.intersection(*(set(obj) for _, _, _, obj in atomic_data_objects))
+                if not variants:
+                    raise NotFound('no common variant for atom {} in {}'.format(
+                        symbol, ' and '.join('`{}`'.format(f.name) for _, _, f, _ in atomic_data_objects)))
+
+                variant = max(variants, key=_variant_key)
+
+            result_kind = dict(element=symbol, variant=variant)
+            lines = ['&KIND {}'.format(symbol)]
+
+            for key, api, family_storage, obj in atomic_data_objects:
+                variant_obj = obj[variant]
+                preferred_name = family_storage.preferred_name(symbol, variant)
+                result_kind[key] = preferred_name
+
+                if api.source == 'BASIS_SET':
+                    lines.append('  BASIS_SET {} {}'.format(
+                        family_storage.metadata.get('basis_type', 'ORB'), preferred_name))
+                else:
+                    lines.append('  POTENTIAL {}'.format(preferred_name))
+
+                if (key, family_storage.name, symbol, variant) not in seen:
+                    seen.add((key, family_storage.name, symbol, variant))
+                    data[key].append(str(variant_obj))
+
+            lines.append('&END KIND')
+            result_kind['input'] = '\n'.join(lines)
+            kinds.append(result_kind)
+
+        header = ''
+        if kwargs.get('header', True):
+            header = data_header(flask.url_for('api.batch', _external=True), library.basis_sets_storage)
+
+        return flask.jsonify(
+            query=dict(type='BATCH', kinds=kwargs['kinds']),
+            result=dict(
+                basis_sets=header + ''.join(data['basis_set']) if data['basis_set'] else '',
+                pseudopotentials=header + ''.join(data['pseudopotential']) if data['pseudopotential'] else '',
+                kinds=kinds,
+                input='\n'.join(k['input'] for k in kinds)
+            )
+        )
+
+
+api_blueprint.add_url_rule('/batch', view_func=BatchAPI.as_view(name='batch'))
+
+
 class BaseMetadataAPI(MethodView):
     decorators = [limiter.limit(Config.API_LIMIT)]
     source: str = ''
@@ -261,7 +677,7 @@ class BaseMetadataAPI(MethodView):
 
     @parser.use_kwargs({'name': field_name}, location='view_args')
     def get(self, **kwargs):
-        storage: Storage = flask.current_app.config['{}S_STORAGE'.format(self.source)]
+        storage: Storage = get_library().storage(self.source)
         name = kwargs.get('name')
 
         try:
@@ -0,0 +1,265 @@
+import datetime
+import hashlib
+import pathlib
+import threading
+import time
+
+from typing import Any, Dict, Optional, Tuple
+
+import flask
+import h5py
+from flask import Flask
+
+import cp2k_basis
+from cp2k_basis import logger
+from cp2k_basis.basis_set import BasisSetsStorage
+from cp2k_basis.cache import LRUCache
+from cp2k_basis.pseudopotential import PseudopotentialsStorage
+
+l_logger = logger.getChild('webservice.library')
+
+
+def build_datetime(date_build: str) -> datetime.datetime:
+    """Get the date at which a library was built, from its `date_build` attribute (in ISO format).
+    It is in UTC, but older library files have a naive date, in local time (which is then assumed to be the one
+    of the server).
+    """
+
+    date = datetime.datetime.fromisoformat(date_build)
+    if date.tzinfo is None:
+        date = date.astimezone()
+
+    return date
+
+
+class Library:
+    """A loaded library file, and everything which is derived from it (caches, pre-rendered responses, etc).
+
+    When the file is reloaded, a new `Library` replaces the previous one as a whole (see `load_library()`), while the
+    requests which already started keep the previous one (see `get_library()`).
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        basis_sets_storage: BasisSetsStorage,
+        pseudopotentials_storage: PseudopotentialsStorage,
+        library_hash: str,
+        f: h5py.File = None,
+        response_cache: LRUCache = None
+    ):
+        self.path = path
+        self.basis_sets_storage = basis_sets_storage
+        self.pseudopotentials_storage = pseudopotentials_storage
+
+        # identifies the library (and the version of the webservice), for the ETags of the responses
+        self.hash = library_hash
+
+        # only kept open if read lazily
+        self.file = f
+
+        # (HTTP dates are in UTC, with a resolution of one second)
+        self.last_modified = build_datetime(basis_sets_storage.date_build).astimezone(datetime.timezone.utc).replace(
+            microsecond=0) if basis_sets_storage.date_build else None
+
+        self.response_cache = response_cache
+
+        # rendered on the first request
+        self.index_page = None
+        self.data_response = None
+
+        # set by `load_library()`
+        self.loaded_at: datetime.datetime = None
+        self.load_time: float = None
+
+    def storage(self, source: str):
+        """Get the storage for `source` (either `BASIS_SET` or `PSEUDOPOTENTIAL`)"""
+
+        if source == 'BASIS_SET':
+            return self.basis_sets_storage
+        elif source == 'PSEUDOPOTENTIAL':
+            return self.pseudopotentials_storage
+        else:
+            raise ValueError('unknown source {}'.format(source))
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            build_date=self.basis_sets_storage.date_build,
+            loaded_at=self.loaded_at.isoformat() if self.loaded_at else None,
+            load_time=self.load_time,
+        )
+
+
+def _file_signature(path: pathlib.Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_library(app: Flask) -> Library:
+    """Read the library file given by `app.config['LIBRARY']`"""
+
+    start = time.perf_counter()
+
+    path = pathlib.Path(app.config['LIBRARY'])
+    if not path.exists():
+        raise FileNotFoundError('Library file `{}` does not exists'.format(path))
+
+    lazy = app.config['LIBRARY_LAZY']
+
+    library_hash = hashlib.sha256(cp2k_basis.__version__.encode())
+    with path.open('rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b''):
+            library_hash.update(chunk)
+
+    # if lazy, the file stays open, so that the variants can be read later
+    f = h5py.File(path, 'r')
+    bs_storage = BasisSetsStorage.read_hdf5(f, lazy=lazy)
+    pp_storage = PseudopotentialsStorage.read_hdf5(f, lazy=lazy)
+
+    if lazy:
+        for storage in [bs_storage, pp_storage]:
+            storage.set_family_cache(app.config['LIBRARY_CACHE_MAX_FAMILIES'], app.config['LIBRARY_CACHE_MAX_BYTES'])
+    else:
+        f.close()
+
+    library = Library(
+        path,
+        bs_storage,
+        pp_storage,
+        library_hash.hexdigest(),
+        f if lazy else None,
+        LRUCache(app.config['RESPONSE_CACHE_MAX_ENTRIES'], app.config['RESPONSE_CACHE_MAX_BYTES'])
+        if app.config['CACHE_RESPONSES'] else None
+    )
+
+    library.loaded_at = datetime.datetime.now()
+    library.load_time = time.perf_counter() - start
+
+    return library
+
+
+def load_library(app: Flask) -> Library:
+    """Read the library file, then make it the library of `app`.
+
+    The swap is a single assignment, so a request gets either the previous or the new library, never a mix of both.
+    The previous file is closed when the last request using it is done (i.e., when it is garbage collected).
+    """
+
+    library = read_library(app)
+
+    app.config['LOADED_LIBRARY'] = library
+    app.config['BASIS_SETS_STORAGE'] = library.basis_sets_storage
+    app.config['PSEUDOPOTENTIALS_STORAGE'] = library.pseudopotentials_storage
+
+    l_logger.info('library {} (built {}) loaded in {:.3f}s'.format(
+        library.path, library.basis_sets_storage.date_build, library.load_time))
+
+    return library
+
+
+def get_library() -> Library:
+    """Get the library for the current request, which does not change until the end of the request, even if the
+    library is reloaded in the meantime
+    """
+
+    if flask.has_request_context():
+        if 'library' not in flask.g:
+            flask.g.library = flask.current_app.config['LOADED_LIBRARY']
+
+        return flask.g.library
+
+    return flask.current_app.config['LOADED_LIBRARY']
+
+
+def pin_library():
+    """Set the library for the current request (see `get_library()`)"""
+
+    flask.g.library = flask.current_app.config['LOADED_LIBRARY']
+
+
+class LibraryReloader:
+    """Reload the library of an app in a background thread, when requested (`reload()`) or when the file changes
+    (if `watch()` is running).
+    Only one reload runs at a time.
+    """
+
+    def __init__(self, app: Flask):
+        self.app = app
+
+        self.reloads = 0
+        self.failures = 0
+        self.last_failure_at: datetime.datetime = None  # (the error itself is only logged)
+
+        self._lock = threading.Lock()
+        self._signature = _file_signature(pathlib.Path(app.config['LIBRARY']))
+        self._watcher: threading.Thread = None
+        self._stop = threading.Event()
+
+    def reload(self, wait: bool = False) -> threading.Thread:
+        """Reload in a background thread (and wait for it to finish if `wait`)"""
+
+        thread = threading.Thread(target=self._reload, name='library-reload', daemon=True)
+        thread.start()
+
+        if wait:
+            thread.join()
+
+        return thread
+
+    def _reload(self):
+        with self._lock:
+            signature = _file_signature(pathlib.Path(self.app.config['LIBRARY']))
+
+            try:
+                load_library(self.app)
+            except Exception as e:
+                # the previous library is kept
+                self.failures += 1
+                self.last_failure_at = datetime.datetime.now(datetime.timezone.utc)
+                l_logger.error('cannot reload library: {}: {}'.format(type(e).__name__, e))
+            else:
+                self.reloads += 1
+            finally:
+                self._signature = signature
+
+    def watch(self, interval: float):
+        """Check the library file every `interval` seconds, and reload it once it has changed (and has not
+        changed since the previous check, so that it is not read while being written)
+        """
+
+        if self._watcher is not None:
+            return
+
+        def watch_loop():
+            previous = self._signature
+            while not self._stop.wait(interval):
+                current = _file_signature(pathlib.Path(self.app.config['LIBRARY']))
+                if current is not None and current == previous and current != self._signature:
+                    l_logger.info('library file changed, reload')
+                    self._reload()
+
+                previous = current
+
+        self._watcher = threading.Thread(target=watch_loop, name='library-watch', daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        """Stop watching"""
+
+        if self._watcher is not None:
+            self._stop.set()
+            self._watcher.join()
+            self._watcher = None
+            self._stop.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            reloads=self.reloads,
+            failures=self.failures,
+            last_failure_at=self.last_failure_at.isoformat() if self.last_failure_at else None,
+            watching=self._watcher is not None
+        )
@@ -0,0 +1,121 @@
+import gzip
+import struct
+import zlib
+
+from typing import List
+
+import flask
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'  # no file name, no mtime, unknown OS
+COMPRESS_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _deflate(data: bytes, mode: int) -> bytes:
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(mode)
+
+
+class RenderedResponse:
+    """Body of a response, `head + middle + tail`, where `middle` may change for each request (it is empty if not
+    given).
+
+    The compressed versions of the body are produced when first needed, then kept: for gzip, `tail` is compressed on
+    its own, so that `head + middle` only needs to be compressed (which is cheap, since it is short) and put in front
+    of it. A complete gzip body, and a brotli one (if the `brotli` package is available), are only produced for an
+    empty `middle`.
+    """
+
+    def __init__(self, head: str, tail: str = '', mimetype: str = 'application/json'):
+        self.head = head.encode()
+        self.tail = tail.encode()
+        self.mimetype = mimetype
+
+        # if two threads need the same encoding at once, it is produced twice, which is harmless
+        self._deflated_tail: bytes = None
+        self._gzipped: bytes = None
+        self._brotlied: bytes = None
+
+    @property
+    def deflated_tail(self) -> bytes:
+        if self._deflated_tail is None:
+            self._deflated_tail = _deflate(self.tail, zlib.Z_FINISH)
+
+        return self._deflated_tail
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.head + self.tail, COMPRESS_LEVEL, mtime=0)
+
+        return self._gzipped
+
+    @property
+    def brotlied(self) -> bytes:
+        if self._brotlied is None:
+            self._brotlied = brotli.compress(self.head + self.tail, quality=BROTLI_QUALITY)
+
+        return self._brotlied
+
+    def estimated_size(self) -> int:
+        """Size of the text, counted twice: the compressed versions are not known yet when the response is cached,
+        but they are (much) smaller than the text.
+        """
+
+        return 2 * (len(self.head) + len(self.tail))
+
+    def body(self, middle: str = '') -> bytes:
+        return self.head + middle.encode() + self.tail
+
+    def gzip_body(self, middle: str = '') -> bytes:
+        if not middle:
+            return self.gzipped
+
+        start = self.head + middle.encode()
+
+        # `start` ends with a sync flush, so that the (final) blocks of `tail` can follow
+        return GZIP_HEADER + _deflate(start, zlib.Z_SYNC_FLUSH) + self.deflated_tail + struct.pack(
+            '<II', zlib.crc32(self.tail, zlib.crc32(start)), (len(start) + len(self.tail)) & 0xffffffff)
+
+    def brotli_body(self, middle: str = '') -> bytes:
+        if middle or brotli is None:
+            raise ValueError('no brotli body')
+
+        return self.brotlied
+
+    def encodings(self, middle: str = '') -> List[str]:
+        """Available encodings, in order of preference"""
+
+        return (['br'] if not middle and brotli is not None else []) + ['gzip', 'identity']
+
+    def response(self, middle: str = '') -> flask.Response:
+        """Get the response to the current request, compressed with the best encoding accepted by the client"""
+
+        accept_encodings = flask.request.accept_encodings
+        encoding = 'identity'
+
+        for e in self.encodings(middle):
+            if accept_encodings[e] > 0:
+                encoding = e
+                break
+
+        if encoding == 'br':
+            body = self.brotli_body(middle)
+        elif encoding == 'gzip':
+            body = self.gzip_body(middle)
+        else:
+            body = self.body(middle)
+
+        response = flask.current_app.response_class(body, mimetype=self.mimetype)
+        response.vary.add('Accept-Encoding')
+
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+        return response
@@ -1,13 +1,23 @@
+import datetime
+import gzip
+import json
+import os
 import pathlib
-from unittest import TestCase
+import shutil
+import tempfile
+import time
+from unittest import TestCase, skipUnless
 
 from cp2k_basis.elements import ElementSet
-from cp2k_basis_webservice import Config, create_app
+from cp2k_basis_webservice import Config, create_app, load_library
+from cp2k_basis_webservice.library import get_library
+from cp2k_basis_webservice.responses import RenderedResponse, brotli
 
 from cp2k_basis.basis_set import AtomicBasisSetsParser
 from cp2k_basis.pseudopotential import AtomicPseudopotentialsParser
 
 import flask
+import h5py
 
 from tests import BaseDataObjectMixin
 
@@ -68,6 +78,23 @@ class GeneralAPITestCase(FlaskAppMixture):
                  if 'tags' in self.pp_storage[n].metadata)
         )
 
+    def test_data_rendered_once_ok(self):
+        self.assertIsNone(flask.current_app.config['LOADED_LIBRARY'].data_response)
+
+        response = self.client.get(flask.url_for('api.data'))
+        self.assertEqual(response.mimetype, 'application/json')
+
+        rendered = flask.current_app.config['LOADED_LIBRARY'].data_response
+        self.assertIsNotNone(rendered)
+
+        # same bytes as `flask.jsonify()`
+        self.assertEqual(response.data, flask.jsonify(**response.get_json()).get_data())
+
+        response_gzip = self.client.get(flask.url_for('api.data'), headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response_gzip.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response_gzip.data), response.data)
+        self.assertIs(flask.current_app.config['LOADED_LIBRARY'].data_response, rendered)
+
     def test_names_no_elements_ok(self):
         response = self.client.get(flask.url_for('api.names'))
         self.assertEqual(response.status_code, 200)
@@ -118,6 +145,464 @@ class GeneralAPITestCase(FlaskAppMixture):
         )
 
 
+class IndexPageTestCase(FlaskAppMixture):
+    def test_index_ok(self):
+        self.assertIsNone(flask.current_app.config['LOADED_LIBRARY'].index_page)
+
+        response = self.client.get(flask.url_for('visitor.index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/html')
+        self.assertIn(b'SZV-MOLOPT-GTH', response.data)
+
+        # rendered once ...
+        rendered = flask.current_app.config['LOADED_LIBRARY'].index_page
+        self.assertIsNotNone(rendered)
+
+        response_again = self.client.get(flask.url_for('visitor.index'))
+        self.assertEqual(response_again.data, response.data)
+        self.assertIs(flask.current_app.config['LOADED_LIBRARY'].index_page, rendered)
+
+        # ... until the library is loaded again
+        load_library(flask.current_app)
+        self.assertIsNone(flask.current_app.config['LOADED_LIBRARY'].index_page)
+
+        response_again = self.client.get(flask.url_for('visitor.index'))
+        self.assertEqual(response_again.data, response.data)
+
+
+class FamilyCacheTestCase(FlaskAppMixture):
+    def setUp(self) -> None:
+        Config.LIBRARY_CACHE_MAX_FAMILIES = 1
+        Config.CACHE_RESPONSES = False
+        super().setUp()
+
+        self.bs_storage = flask.current_app.config['BASIS_SETS_STORAGE']
+
+    def tearDown(self) -> None:
+        Config.LIBRARY_CACHE_MAX_FAMILIES = None
+        Config.CACHE_RESPONSES = True
+
+    def test_family_cache_ok(self):
+        self.assertIsNotNone(flask.current_app.config['LOADED_LIBRARY'].file)
+
+        basis_set_1 = self.bs_storage.families['SZV-MOLOPT-GTH']
+        basis_set_2 = self.bs_storage.families['DZVP-MOLOPT-GTH']
+        self.assertFalse(basis_set_1.is_loaded())
+
+        # variants are read on the first request ...
+        response = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(basis_set_1.is_loaded())
+
+        # ... and dropped when another family is requested
+        response = self.client.get(flask.url_for('api.basis-data', name='DZVP-MOLOPT-GTH'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(basis_set_1.is_loaded())
+        self.assertTrue(basis_set_2.is_loaded())
+
+        # ... but read again if needed
+        response_again = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False))
+        self.assertEqual(response_again.status_code, 200)
+        self.assertTrue(basis_set_1.is_loaded())
+
+        response = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False))
+        self.assertEqual(response.get_json(), response_again.get_json())
+
+        # check stats
+        response = self.client.get(flask.url_for('api.stats'))
+        self.assertEqual(response.status_code, 200)
+
+        stats = response.get_json()['result']['families']['basis_sets']
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['max_entries'], 1)
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 3, 2))
+        self.assertEqual(stats['bytes'], basis_set_1.estimated_size())
+
+
+class ResponseCacheTestCase(FlaskAppMixture):
+    def test_response_cache_ok(self):
+        cache = flask.current_app.config['LOADED_LIBRARY'].response_cache
+        self.assertIsNotNone(cache)
+
+        url = flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 1, 1))
+
+        # cached ...
+        response_cached = self.client.get(url)
+        self.assertEqual(response_cached.data, response.data)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 1, 1))
+
+        # ... and the same as without cache
+        flask.current_app.config['LOADED_LIBRARY'].response_cache = None
+        self.assertEqual(self.client.get(url).data, response.data)
+        flask.current_app.config['LOADED_LIBRARY'].response_cache = cache
+
+        # the header is added to the cached data
+        response_header = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH'))
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 1, 1))
+
+        data = response.get_json()
+        data_header = response_header.get_json()
+        self.assertTrue(data_header['result']['data'].startswith('# URL'))
+        self.assertTrue(data_header['result']['data'].endswith(data['result']['data']))
+        self.assertEqual(data_header['result']['variants'], data['result']['variants'])
+
+        # another entry for a subset of the elements
+        response = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', elements='C'))
+        self.assertEqual(response.get_json()['result']['elements'], ['C'])
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 2, 2))
+
+        # errors are not cached
+        response = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', elements='Ne'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(cache), 2)
+
+        # check stats
+        response = self.client.get(flask.url_for('api.stats'))
+        stats = response.get_json()['result']['responses']
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['hits'], 2)
+
+
+class ConditionalResponseTestCase(FlaskAppMixture):
+    def test_etag_ok(self):
+        # the data with a header (the default) are only equivalent, so their ETag is weak
+        urls = [
+            (flask.url_for('visitor.index'), False),
+            (flask.url_for('api.data'), False),
+            (flask.url_for('api.names', elements='C'), False),
+            (flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH'), True),
+            (flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False), False),
+            (flask.url_for('api.basis-raw', name='SZV-MOLOPT-GTH'), True),
+            (flask.url_for('api.basis-metadata', name='SZV-MOLOPT-GTH'), False),
+            (flask.url_for('api.pseudo-data', name='GTH-BLYP', elements='C'), True),
+            (flask.url_for('api.pseudo-raw', name='GTH-BLYP', elements='C', header=False), False),
+        ]
+
+        etags = set()
+
+        for url, expected_weak in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+                etag, weak = response.get_etag()
+                self.assertEqual(weak, expected_weak)
+                self.assertIsNotNone(response.last_modified)
+                etags.add(etag)
+
+                # same response
+                response = self.client.get(url, headers={'If-None-Match': '"{}"'.format(etag)})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.data, b'')
+                self.assertEqual(response.get_etag(), (etag, expected_weak))
+
+                response = self.client.get(url, headers={'If-None-Match': 'W/"{}"'.format(etag)})
+                self.assertEqual(response.status_code, 304)
+
+                response = self.client.get(url, headers={'If-None-Match': '"x", "{}"'.format(etag)})
+                self.assertEqual(response.status_code, 304)
+
+                # other response
+                response = self.client.get(url, headers={'If-None-Match': '"x"'})
+                self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(len(etags), len(urls))
+
+    def test_last_modified_ok(self):
+        url = flask.url_for('api.data')
+        last_modified = self.client.get(url).headers['Last-Modified']
+
+        response = self.client.get(url, headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(url, headers={'If-Modified-Since': 'Thu, 01 Jan 2015 00:00:00 GMT'})
+        self.assertEqual(response.status_code, 200)
+
+        # ETag takes precedence
+        response = self.client.get(url, headers={'If-Modified-Since': last_modified, 'If-None-Match': '"x"'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_conditional_ok(self):
+        response = self.client.get(flask.url_for('api.stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+        response = self.client.get(flask.url_for('api.basis-data', name='xx'))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_not_found_ko(self):
+        """A request which would fail is never answered with 304"""
+
+        last_modified = self.client.get(flask.url_for('api.data')).headers['Last-Modified']
+
+        urls = [
+            (flask.url_for('api.basis-data', name='xx'), 404),
+            (flask.url_for('api.basis-raw', name='xx'), 404),
+            (flask.url_for('api.pseudo-metadata', name='xx'), 404),
+            (flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', elements='U'), 404),
+            (flask.url_for('api.pseudo-raw', name='GTH-BLYP', elements='U'), 404),
+            (flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', elements='Xx'), 422),
+            (flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header='x'), 422),
+            (flask.url_for('api.names', elements='Xx'), 422),
+        ]
+
+        for url, status_code in urls:
+            for headers in [{'If-Modified-Since': last_modified}, {'If-None-Match': '*'}]:
+                with self.subTest(url=url, headers=headers):
+                    response = self.client.get(url, headers=headers)
+                    self.assertEqual(response.status_code, status_code)
+                    self.assertNotIn('ETag', response.headers)
+
+        # ... but existing resources are
+        response = self.client.get(
+            flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', elements='H'), headers={'If-None-Match': '*'})
+        self.assertEqual(response.status_code, 304)
+
+
+class CompressedResponseTestCase(FlaskAppMixture):
+    def test_gzip_ok(self):
+        for header in [False, True]:
+            with self.subTest(header=header):
+                url = flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=header)
+
+                response = self.client.get(url)
+                self.assertNotIn('Content-Encoding', response.headers)
+                self.assertIn('Accept-Encoding', response.vary)
+
+                response_gzip = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+                self.assertEqual(response_gzip.status_code, 200)
+                self.assertEqual(response_gzip.headers['Content-Encoding'], 'gzip')
+                self.assertIn('Accept-Encoding', response_gzip.vary)
+                self.assertLess(len(response_gzip.data), len(response.data))
+
+                data = json.loads(gzip.decompress(response_gzip.data))
+                if header:
+                    self.assertTrue(data['result']['data'].startswith('# URL'))
+                    self.assertEqual(data['result']['variants'], response.get_json()['result']['variants'])
+                else:
+                    self.assertEqual(data, response.get_json())
+
+                # compressed response have their own ETag
+                etag = response_gzip.get_etag()[0]
+                self.assertEqual(etag, response.get_etag()[0] + '-gzip')
+
+                response = self.client.get(
+                    url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': '"{}"'.format(etag)})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.get_etag()[0], etag)
+
+    def test_gzip_not_accepted_ok(self):
+        response = self.client.get(
+            flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH'), headers={'Accept-Encoding': 'gzip;q=0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_splice_gzip_ok(self):
+        rendered = RenderedResponse('{"data": "', 'xyz' * 1000 + '"}')
+
+        for middle in ['abc', 'x' * 10000, '']:
+            self.assertEqual(gzip.decompress(rendered.gzip_body(middle)), rendered.body(middle))
+
+    def test_compress_when_needed_ok(self):
+        rendered = RenderedResponse('{"data": "', 'xyz' * 1000 + '"}')
+        self.assertIsNone(rendered._deflated_tail)
+
+        # with a middle part, only the tail is compressed
+        rendered.gzip_body('abc')
+        self.assertIsNotNone(rendered._deflated_tail)
+        self.assertIsNone(rendered._gzipped)
+        self.assertIsNone(rendered._brotlied)
+
+        # then kept
+        gzipped = rendered.gzip_body()
+        self.assertIs(rendered.gzip_body(), gzipped)
+
+    @skipUnless(brotli, 'brotli is not available')
+    def test_brotli_ok(self):
+        url = flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False)
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.data), self.client.get(url).data)
+
+        # not with a header
+        response = self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH'), headers={
+            'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+
+
+class ReloadLibraryTestCase(FlaskAppMixture):
+    def setUp(self) -> None:
+        # work on a copy, which is modified
+        self.directory = tempfile.TemporaryDirectory()
+        self.library_path = pathlib.Path(self.directory.name) / 'library.h5'
+        shutil.copy(pathlib.Path(__file__).parent / 'LIBRARY_EXAMPLE.h5', self.library_path)
+
+        super().setUp()
+
+        self.app.config['LIBRARY'] = str(self.library_path)
+        self.reloader = self.app.extensions['library_reloader']
+
+    def tearDown(self) -> None:
+        self.reloader.stop()
+        self.app.config['LOADED_LIBRARY'] = None
+        self.directory.cleanup()
+
+    def _rebuild_library(self, date_build: str):
+        with h5py.File(self.library_path, 'a') as f:
+            f.attrs['date_build'] = date_build
+
+        # make sure that the signature of the file changes
+        stat = self.library_path.stat()
+        os.utime(self.library_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_reload_ok(self):
+        library = flask.current_app.config['LOADED_LIBRARY']
+        response = self.client.get(flask.url_for('api.data'))
+        self.assertIsNotNone(library.data_response)
+
+        self._rebuild_library('2042-01-01T00:00:00')
+
+        with self.app.test_request_context():
+            self.assertIs(get_library(), library)
+
+            self.reloader.reload(wait=True)
+
+            # same library until the end of the request ...
+            self.assertIs(get_library(), library)
+
+        # ... but a new one for the next requests, with new caches
+        new_library = flask.current_app.config['LOADED_LIBRARY']
+        self.assertIsNot(new_library, library)
+        self.assertIsNone(new_library.data_response)
+        self.assertIsNot(new_library.response_cache, library.response_cache)
+        self.assertIs(flask.current_app.config['BASIS_SETS_STORAGE'], new_library.basis_sets_storage)
+
+        response_new = self.client.get(flask.url_for('api.data'))
+        self.assertNotEqual(response_new.get_etag(), response.get_etag())
+        self.assertEqual(response_new.get_json()['result']['basis_sets']['build_date'], '2042-01-01T00:00:00')
+
+        stats = self.client.get(flask.url_for('api.stats')).get_json()['result']['library']
+        self.assertEqual(stats['build_date'], '2042-01-01T00:00:00')
+        self.assertEqual((stats['reloads'], stats['failures']), (1, 0))
+        self.assertIsNotNone(stats['load_time'])
+
+    def test_last_modified_ok(self):
+        utc = datetime.timezone.utc
+
+        # older libraries have a naive date, in local time
+        library = flask.current_app.config['LOADED_LIBRARY']
+        self.assertEqual(
+            library.last_modified,
+            datetime.datetime.fromisoformat(library.basis_sets_storage.date_build).astimezone(utc).replace(
+                microsecond=0)
+        )
+
+        self._rebuild_library('2042-01-01T12:00:00.5+02:00')
+        self.reloader.reload(wait=True)
+
+        self.assertEqual(
+            flask.current_app.config['LOADED_LIBRARY'].last_modified, datetime.datetime(2042, 1, 1, 10, tzinfo=utc))
+
+    def test_reload_failure_ok(self):
+        library = flask.current_app.config['LOADED_LIBRARY']
+        self.library_path.write_bytes(b'not a library')
+
+        self.reloader.reload(wait=True)
+
+        # the previous library is kept
+        self.assertIs(flask.current_app.config['LOADED_LIBRARY'], library)
+        self.assertEqual(self.reloader.failures, 1)
+        self.assertIsNotNone(self.reloader.last_failure_at)
+
+        # the error (which contains the path of the file) is not public
+        response = self.client.get(flask.url_for('api.stats'))
+        stats = response.get_json()['result']['library']
+        self.assertEqual(stats['failures'], 1)
+        self.assertEqual(stats['last_failure_at'], self.reloader.last_failure_at.isoformat())
+        self.assertNotIn(str(self.library_path), response.get_data(as_text=True))
+
+        self.assertEqual(self.client.get(flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH')).status_code, 200)
+
+    def test_watch_ok(self):
+        library = flask.current_app.config['LOADED_LIBRARY']
+        self.reloader.watch(0.01)
+
+        self._rebuild_library('2042-01-01T00:00:00')
+
+        for _ in range(500):
+            if self.reloader.reloads > 0:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(self.reloader.reloads, 1)
+        self.assertIsNot(flask.current_app.config['LOADED_LIBRARY'], library)
+        self.assertEqual(
+            flask.current_app.config['LOADED_LIBRARY'].basis_sets_storage.date_build, '2042-01-01T00:00:00')
+
+    def test_reload_api_ok(self):
+        url = flask.url_for('api.reload', wait=True)
+
+        # disabled
+        self.assertEqual(self.client.post(url).status_code, 404)
+
+        self.app.config['RELOAD_TOKEN'] = 'secret'
+
+        self.assertEqual(self.client.post(url).status_code, 403)
+        self.assertEqual(self.client.post(url, headers={'Authorization': 'Bearer wrong'}).status_code, 403)
+        self.assertEqual(self.reloader.reloads, 0)
+
+        response = self.client.post(url, headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['result']['reloads'], 1)
+
+        # in the background
+        response = self.client.post(flask.url_for('api.reload'), headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 202)
+
+
+class StoredTextTestCase(FlaskAppMixture):
+    def setUp(self) -> None:
+        super().setUp()
+
+        # same library, with the text of the variants
+        self.directory = tempfile.TemporaryDirectory()
+        self.library_path = pathlib.Path(self.directory.name) / 'library.h5'
+
+        with h5py.File(self.app.config['LIBRARY']) as f_in, h5py.File(self.library_path, 'w') as f_out:
+            f_out.attrs['date_build'] = f_in.attrs['date_build']
+            for storage in [get_library().basis_sets_storage, get_library().pseudopotentials_storage]:
+                storage.dump_hdf5(f_out, with_text=True)
+
+    def tearDown(self) -> None:
+        self.app.config['LOADED_LIBRARY'] = None
+        self.directory.cleanup()
+
+    def test_same_responses_ok(self):
+        urls = [
+            flask.url_for('api.basis-data', name='DZVP-MOLOPT-GTH', header=False),
+            flask.url_for('api.pseudo-data', name='GTH-BLYP', elements='C,H', header=False),
+            flask.url_for('api.pseudo-raw', name='GTH-BLYP', header=False),
+        ]
+
+        expected = [self.client.get(url).data for url in urls]
+
+        self.app.config['LIBRARY'] = str(self.library_path)
+        library = load_library(self.app)
+
+        for url, data in zip(urls, expected):
+            self.assertEqual(self.client.get(url).data, data)
+
+        # the numeric data were not needed
+        self.assertIsNotNone(library.pseudopotentials_storage['GTH-BLYP']['C']['q4']._loader)
+
+
 class BasisSetAPITestCase(FlaskAppMixture, BaseDataObjectMixin):
     def setUp(self) -> None:
         super().setUp()
@@ -285,3 +770,116 @@ class PseudopotentialAPITestCase(FlaskAppMixture, BaseDataObjectMixin):
             data['result']['tags'],
             flask.current_app.config['PSEUDOPOTENTIALS_STORAGE'][self.pseudo_name].metadata['tags']
         )
+
+
+class BatchAPITestCase(FlaskAppMixture, BaseDataObjectMixin):
+
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.bs_storage = flask.current_app.config['BASIS_SETS_STORAGE']
+        self.pp_storage = flask.current_app.config['PSEUDOPOTENTIALS_STORAGE']
+
+    def test_batch_ok(self):
+        kinds = [
+            dict(element='C', basis_set='DZVP-MOLOPT-GTH', pseudopotential='GTH-BLYP'),
+            dict(element='H', basis_set='DZVP-MOLOPT-GTH', pseudopotential='GTH-BLYP'),
+            dict(element='C', basis_set='DZVP-MOLOPT-GTH', pseudopotential='GTH-BLYP', variant='q4'),
+        ]
+
+        response = self.client.post(flask.url_for('api.batch'), json=dict(kinds=kinds))
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+
+        self.assertEqual(data['query']['type'], 'BATCH')
+        self.assertEqual(data['query']['kinds'], kinds)
+
+        # the largest common variant is selected
+        self.assertEqual([k['variant'] for k in data['result']['kinds']], ['q4', 'q1', 'q4'])
+
+        for kind in data['result']['kinds']:
+            variant = kind['variant']
+            bs_name = self.bs_storage['DZVP-MOLOPT-GTH'][kind['element']][variant].preferred_name(
+                'DZVP-MOLOPT-GTH', variant)
+            pp_name = self.pp_storage['GTH-BLYP'][kind['element']][variant].preferred_name('GTH-BLYP', variant)
+
+            self.assertEqual(kind['basis_set'], bs_name)
+            self.assertEqual(kind['pseudopotential'], pp_name)
+            self.assertEqual(kind['input'], '&KIND {}\n  BASIS_SET ORB {}\n  POTENTIAL {}\n&END KIND'.format(
+                kind['element'], bs_name, pp_name))
+
+        self.assertEqual(data['result']['input'], '\n'.join(k['input'] for k in data['result']['kinds']))
+
+        # each atomic variant is only given once
+        abs_variants = list(AtomicBasisSetsParser(data['result']['basis_sets']).iter_atomic_basis_set_variants())
+        self.assertEqual([a.symbol for a in abs_variants], ['C', 'H'])
+        self.assertAtomicBasisSetEqual(abs_variants[0], self.bs_storage['DZVP-MOLOPT-GTH']['C']['q4'])
+
+        app_variants = list(
+            AtomicPseudopotentialsParser(data['result']['pseudopotentials']).iter_atomic_pseudopotential_variants())
+        self.assertEqual([a.symbol for a in app_variants], ['C', 'H'])
+        self.assertAtomicPseudoEqual(app_variants[1], self.pp_storage['GTH-BLYP']['H']['q1'])
+
+    def test_batch_partial_kind_ok(self):
+        response = self.client.post(
+            flask.url_for('api.batch'), json=dict(kinds=[dict(element='H', basis_set='cFIT3')], header=False))
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+
+        self.assertEqual(data['result']['pseudopotentials'], '')
+        self.assertEqual(data['result']['basis_sets'], str(self.bs_storage['cFIT3']['H']['q1']))
+        self.assertEqual(
+            data['result']['input'], '&KIND H\n  BASIS_SET AUX_FIT {}\n&END KIND'.format(
+                self.bs_storage['cFIT3']['H']['q1'].preferred_name('cFIT3', 'q1')))
+
+    def test_batch_ko(self):
+        # invalid requests
+        for kinds in [[], [dict(element='Xx', basis_set='cFIT3')], [dict(element='H')]]:
+            response = self.client.post(flask.url_for('api.batch'), json=dict(kinds=kinds))
+            self.assertEqual(response.status_code, 422)
+
+        response = self.client.post(flask.url_for('api.batch'), data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        # not found
+        for kind in [
+            dict(element='H', basis_set='xx'),
+            dict(element='He', basis_set='cFIT3'),
+            dict(element='H', basis_set='cFIT3', variant='q9'),
+        ]:
+            response = self.client.post(flask.url_for('api.batch'), json=dict(kinds=[kind]))
+            self.assertEqual(response.status_code, 404)
+
+
+class RawDataAPITestCase(FlaskAppMixture):
+    def test_raw_ok(self):
+        for endpoint, name in [('basis', 'DZVP-MOLOPT-GTH'), ('pseudo', 'GTH-BLYP')]:
+            for elements in [None, 'C,H']:
+                with self.subTest(endpoint=endpoint, elements=elements):
+                    response = self.client.get(flask.url_for(
+                        'api.{}-raw'.format(endpoint), name=name, elements=elements, header=False))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(response.is_streamed)
+                    self.assertEqual(response.mimetype, 'text/plain')
+
+                    # same as the data, without JSON
+                    data = self.client.get(flask.url_for(
+                        'api.{}-data'.format(endpoint), name=name, elements=elements, header=False)).get_json()
+                    self.assertEqual(response.get_data(as_text=True), data['result']['data'])
+
+    def test_raw_header_ok(self):
+        url = flask.url_for('api.basis-raw', name='DZVP-MOLOPT-GTH', elements='C')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        data = response.get_data(as_text=True)
+        self.assertTrue(data.startswith('# URL: {}\n'.format(url)))
+        self.assertIn('# ---\n', data)
+
+    def test_raw_ko(self):
+        response = self.client.get(flask.url_for('api.basis-raw', name='xx'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.mimetype, 'application/json')
+
+        response = self.client.get(flask.url_for('api.pseudo-raw', name='GTH-BLYP', elements='U'))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,211 @@
+import asyncio
+import gzip
+import threading
+import urllib.parse
+
+import flask
+
+from cp2k_basis_webservice import Config
+from cp2k_basis_webservice.asgi import create_asgi_app
+from tests.tests_api import FlaskAppMixture
+
+
+class ASGITestCase(FlaskAppMixture):
+    def setUp(self) -> None:
+        Config.RATELIMIT_ENABLED = False  # many requests
+        super().setUp()
+
+        self.asgi_app = create_asgi_app(self.app, max_workers=2, max_pending=4)
+
+    def tearDown(self) -> None:
+        del Config.RATELIMIT_ENABLED
+        self.asgi_app.executor.shutdown()
+
+    def _scope(self, url: str, headers=None, method='GET'):
+        url = urllib.parse.urlsplit(url)
+        headers = dict(headers or {}, Host=url.netloc)
+
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': url.path,
+            'root_path': '',
+            'query_string': url.query.encode(),
+            'headers': [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            'client': ('127.0.0.1', 12345),
+            'server': ('127.0.0.1', 5000),
+        }
+
+    async def _request(self, url: str, headers=None, method='GET'):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.asgi_app(self._scope(url, headers, method), receive, send)
+
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertTrue(all(m['type'] == 'http.response.body' for m in messages[1:]))
+        self.assertEqual([m['more_body'] for m in messages[1:]], [True] * (len(messages) - 2) + [False])
+
+        return messages[0]['status'], dict(messages[0]['headers']), b''.join(m['body'] for m in messages[1:])
+
+    def request(self, url: str, headers=None, method='GET'):
+        return asyncio.run(self._request(url, headers, method))
+
+    def test_same_responses_ok(self):
+        urls = [
+            flask.url_for('api.data'),
+            flask.url_for('api.names', elements='C', bs_name='molopt'),
+            flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False),
+            flask.url_for('api.pseudo-data', name='GTH-BLYP', elements='C', header=False),
+            flask.url_for('api.basis-metadata', name='SZV-MOLOPT-GTH'),
+            flask.url_for('api.basis-data', name='xx'),
+            flask.url_for('api.pseudo-raw', name='GTH-BLYP'),
+        ]
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                status, headers, body = self.request(url)
+
+                self.assertEqual(status, response.status_code)
+                self.assertEqual(headers[b'content-type'], response.headers['Content-Type'].encode())
+                self.assertEqual(body, response.data)
+
+    def test_headers_ok(self):
+        url = flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH', header=False)
+
+        status, headers, body = self.request(url, {'Accept-Encoding': 'gzip'})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers[b'content-encoding'], b'gzip')
+        self.assertEqual(gzip.decompress(body), self.client.get(url).data)
+
+        status, _, _ = self.request(url, {'If-None-Match': headers[b'etag'].decode()})
+        self.assertEqual(status, 304)
+
+    def test_shared_cache_ok(self):
+        cache = flask.current_app.config['LOADED_LIBRARY'].response_cache
+        url = flask.url_for('api.basis-data', name='SZV-MOLOPT-GTH')
+
+        self.client.get(url)
+        self.request(url)
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_concurrent_requests_ok(self):
+        url = flask.url_for('api.pseudo-data', name='GTH-BLYP', header=False)
+        expected = self.client.get(url).data
+
+        threads = set()
+        original_call_app = self.asgi_app.call_app
+
+        def call_app(*args):
+            threads.add(threading.current_thread().name)
+            return original_call_app(*args)
+
+        self.asgi_app.call_app = call_app
+
+        async def requests():
+            return await asyncio.gather(*(self._request(url) for _ in range(20)))
+
+        for status, _, body in asyncio.run(requests()):
+            self.assertEqual(status, 200)
+            self.assertEqual(body, expected)
+
+        # only the threads of the pool are used
+        self.assertLessEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('asgi-worker') for name in threads))
+
+    def test_lifespan_ok(self):
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.asgi_app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_streamed_response_ok(self):
+        url = flask.url_for('api.pseudo-raw', name='GTH-BLYP', header=False)
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.asgi_app(self._scope(url), receive, send))
+
+        # one message per atomic variant
+        bodies = [m['body'] for m in messages[1:]]
+        self.assertEqual(
+            bodies, [str(v).encode() for a in self.app.config['PSEUDOPOTENTIALS_STORAGE']['GTH-BLYP'].values()
+                     for v in a.values()])
+
+    def _wrap_put(self, produced: list):
+        """Record the messages produced by the worker"""
+
+        original_call_app = self.asgi_app.call_app
+
+        def call_app(environ, put, cancelled):
+            def recorded_put(message):
+                put(message)
+                produced.append(message)
+
+            return original_call_app(environ, recorded_put, cancelled)
+
+        self.asgi_app.call_app = call_app
+
+    def test_slow_client_ok(self):
+        url = flask.url_for('api.pseudo-raw', name='GTH-BLYP', header=False)
+        produced, sent, pending = [], [], []
+        self._wrap_put(produced)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            await asyncio.sleep(.01)
+
+            # the worker does not get far ahead of the client, and the request is pending until the end
+            self.assertLessEqual(len(produced) - len(sent), self.asgi_app.MAX_QUEUED_MESSAGES + 1)
+            pending.append(self.asgi_app._pending._value)
+            sent.append(message)
+
+        asyncio.run(self.asgi_app(self._scope(url), receive, send))
+
+        self.assertGreater(len(sent), self.asgi_app.MAX_QUEUED_MESSAGES + 2)
+        self.assertEqual(set(pending), {self.asgi_app.max_pending - 1})
+        self.assertEqual(self.asgi_app._pending._value, self.asgi_app.max_pending)
+
+    def test_client_gone_ok(self):
+        url = flask.url_for('api.pseudo-raw', name='GTH-BLYP', header=False)
+        produced = []
+        self._wrap_put(produced)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                raise ConnectionError('gone')
+
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.asgi_app(self._scope(url), receive, send))
+
+        # the worker stopped early, and the request is not pending anymore
+        self.assertIsNone(produced[-1])
+        self.assertLess(len(produced), self.asgi_app.MAX_QUEUED_MESSAGES + 4)
+        self.assertEqual(self.asgi_app._pending._value, self.asgi_app.max_pending)
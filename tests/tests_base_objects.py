@@ -1,9 +1,18 @@
+import collections
+import io
+import pathlib
 import unittest
 import re
+import threading
 
+import h5py
+import numpy
 import yaml
 
 from cp2k_basis.base_objects import Filter, FilterFirst, FilterUnique, AddMetadata, BaseFamilyStorage
+from cp2k_basis.elements import ElementSet, SYMB_TO_Z
+from cp2k_basis.basis_set import BasisSetsStorage, BasisSet
+from cp2k_basis.pseudopotential import PseudopotentialsStorage, AtomicPseudopotentialsParser
 
 
 class FilterTestCase(unittest.TestCase):
@@ -112,3 +121,274 @@ class AddMetadataTestCase(unittest.TestCase):
                 self.assertEqual(family_storage.metadata['only_b'], 'x')
             else:
                 self.assertNotIn('only_b', family_storage.metadata)
+
+
+class StorageHDF5TestCase(unittest.TestCase):
+    def setUp(self):
+        self.library_path = pathlib.Path(__file__).parent / 'LIBRARY_EXAMPLE.h5'
+
+    def test_convert_library_ok(self):
+        """Library in the version 1 of the format can be converted to version 2"""
+
+        for storage_type in [BasisSetsStorage, PseudopotentialsStorage]:
+            with h5py.File(self.library_path) as f:
+                self.assertNotIn('format_version', f[storage_type.name].attrs)
+                storage = storage_type.read_hdf5(f)
+
+            f = h5py.File(io.BytesIO(), 'w')
+            storage.dump_hdf5(f)
+            self.assertEqual(f[storage_type.name].attrs['format_version'], 2)
+
+            # a few datasets for all the variants
+            self.assertEqual(len(f[storage_type.name]['pool']), 7)
+            self.assertEqual(len(f[storage_type.name]['families']), 6)
+            self.assertEqual(f[storage_type.name]['families']['names'].shape, (len(storage.families), ))
+
+            storage_v2 = storage_type.read_hdf5(f)
+
+            self.assertEqual(list(storage_v2), list(storage))
+            self.assertEqual(storage_v2.tags_per_family, storage.tags_per_family)
+            self.assertEqual(storage_v2.elements_per_family, storage.elements_per_family)
+            self.assertEqual(storage_v2.element_sets_per_family, storage.element_sets_per_family)
+
+            for name in storage:
+                self.assertEqual(storage_v2[name].metadata, storage[name].metadata)
+                self.assertEqual(str(storage_v2[name]), str(storage[name]))
+
+    def test_deduplicate_variants_ok(self):
+        content = (pathlib.Path(__file__).parent / 'POTENTIAL_MULTI_VARIANT').read_text()
+
+        # same variants in three families, the last one from another source
+        storage = PseudopotentialsStorage()
+        for name, source in [('A', 'x'), ('B', 'x'), ('C', 'y')]:
+            storage.update(
+                AtomicPseudopotentialsParser(content, source=source).iter_atomic_pseudopotential_variants(),
+                lambda names: [name],
+                FilterFirst([(re.compile(r'.*-(q.*)'), '\\1')])
+            )
+
+        self.assertIsNot(storage['A']['Na']['q1'], storage['B']['Na']['q1'])
+        self.assertEqual(storage.element_sets_per_family['A'], ElementSet(SYMB_TO_Z[s] for s in storage['A']))
+
+        # unique elements, sorted by Z
+        self.assertEqual(storage.elements_per_family['A'], ['Na', 'Mg'])
+
+        f = h5py.File(io.BytesIO(), 'w')
+        storage.dump_hdf5(f)
+
+        # only stored once
+        self.assertEqual(f[storage.name]['pool']['symbols'].shape, (4, ))
+        self.assertEqual(f[storage.name]['families']['indices'].shape, (12, ))
+
+        for lazy in [False, True]:
+            storage_read = PseudopotentialsStorage.read_hdf5(f, lazy=lazy)
+
+            self.assertEqual(storage_read.element_sets_per_family, storage.element_sets_per_family)
+            self.assertEqual(storage_read.elements_per_family, storage.elements_per_family)
+
+            # shared if the source is the same
+            self.assertIs(storage_read['A']['Na']['q1'], storage_read['B']['Na']['q1'])
+            self.assertIsNot(storage_read['A']['Na']['q1'], storage_read['C']['Na']['q1'])
+
+            for name in storage:
+                for symbol in storage[name]:
+                    for variant in storage[name][symbol]:
+                        self.assertEqual(
+                            str(storage_read[name][symbol][variant]), str(storage[name][symbol][variant]))
+
+    def test_read_lazy_ok(self):
+        for format_version in [1, 2]:
+            with self.subTest(format_version=format_version):
+                with h5py.File(self.library_path) as f:
+                    storage = BasisSetsStorage.read_hdf5(f)
+
+                f = h5py.File(io.BytesIO(), 'w')
+                storage.dump_hdf5(f, format_version)
+
+                lazy_storage = BasisSetsStorage.read_hdf5(f, lazy=True)
+
+                # index is there, but nothing is loaded
+                self.assertEqual(list(lazy_storage), list(storage))
+                self.assertEqual(lazy_storage.elements_per_family, storage.elements_per_family)
+                self.assertEqual(lazy_storage.tags_per_family, storage.tags_per_family)
+                self.assertFalse(any(family.is_loaded() for family in lazy_storage.values()))
+
+                # load one
+                self.assertEqual(str(lazy_storage['SZV-MOLOPT-GTH']), str(storage['SZV-MOLOPT-GTH']))
+                self.assertTrue(lazy_storage['SZV-MOLOPT-GTH'].is_loaded())
+                self.assertFalse(lazy_storage['TZVP-GTH'].is_loaded())
+
+                for name in storage:
+                    self.assertEqual(lazy_storage[name].metadata, storage[name].metadata)
+                    self.assertEqual(str(lazy_storage[name]), str(storage[name]))
+
+    def test_family_cache_ok(self):
+        """The families are accessed through the cache, which does not need to load them"""
+
+        with h5py.File(self.library_path) as f:
+            storage = BasisSetsStorage.read_hdf5(f)
+
+        f = h5py.File(io.BytesIO(), 'w')
+        storage.dump_hdf5(f)
+
+        lazy_storage = BasisSetsStorage.read_hdf5(f, lazy=True)
+        lazy_storage.set_family_cache(max_entries=1)
+
+        # the size is known from the file
+        family = lazy_storage['SZV-MOLOPT-GTH']
+        self.assertFalse(family.is_loaded())
+        self.assertGreater(family.estimated_size(), 0)
+        self.assertEqual(lazy_storage.family_cache.current_bytes, family.estimated_size())
+
+        family.data_objects
+        self.assertEqual(lazy_storage['SZV-MOLOPT-GTH'], family)
+
+        # iterating goes through the cache as well
+        self.assertEqual([f.name for f in lazy_storage.values()], list(storage))
+        self.assertFalse(family.is_loaded())
+
+        stats = lazy_storage.family_cache.stats()
+        self.assertEqual((stats['entries'], stats['hits']), (1, 1))
+        self.assertEqual(stats['evictions'], len(list(storage)))  # (including the one cached before)
+
+    def test_read_spread_family_ok(self):
+        """Only the rows of the pool used by a family are read, even if they are far apart"""
+
+        with h5py.File(self.library_path) as f:
+            storage = BasisSetsStorage.read_hdf5(f)
+
+        # shares the first and last variants of the pool
+        first_family, last_family = storage['DZVP-MOLOPT-GTH'], storage['cFIT3']
+        first_symbol, last_symbol = next(iter(first_family)), list(last_family)[-1]
+        first = first_family[first_symbol][sorted(first_family[first_symbol])[0]]
+        last = last_family[last_symbol][sorted(last_family[last_symbol])[-1]]
+
+        storage._update(first, 'ZZ-SPREAD', 'first')
+        storage._update(last, 'ZZ-SPREAD', 'last')
+
+        for with_text in [False, True]:
+            with self.subTest(with_text=with_text):
+                f = h5py.File(io.BytesIO(), 'w')
+                storage.dump_hdf5(f, with_text=with_text)
+
+                lazy_storage = BasisSetsStorage.read_hdf5(f, lazy=True)
+                family = lazy_storage['ZZ-SPREAD']
+                data, offsets = family._loader.args[:2]
+                indices = family._loader.args[5]
+                self.assertEqual(sorted(indices), [0, len(f[BasisSetsStorage.name]['pool']['symbols']) - 1])
+
+                # record the rows which are read
+                rows_read = collections.defaultdict(int)
+
+                class RecordedDataset:
+                    def __init__(self, key, dataset):
+                        self.key = key
+                        self.dataset = dataset
+
+                    def __getitem__(self, item):
+                        rows_read[self.key] += item.stop - item.start
+                        return self.dataset[item]
+
+                for key in list(data):
+                    data[key] = RecordedDataset(key, data[key])
+
+                self.assertEqual(str(family), str(storage['ZZ-SPREAD']))
+
+                for key in ['names', 'ints'] + ([] if with_text else ['floats']):
+                    self.assertEqual(
+                        rows_read[key], sum(offsets[key][index + 1] - offsets[key][index] for index in indices))
+
+                if with_text:
+                    self.assertEqual(rows_read['texts'], 2)
+
+    def test_load_families_concurrently_ok(self):
+        """Loading a family does not wait for another family to be loaded"""
+
+        with h5py.File(self.library_path) as f:
+            storage = BasisSetsStorage.read_hdf5(f)
+
+        variants = [(obj[v], v) for obj in storage['SZV-MOLOPT-GTH'].values() for v in obj]
+        started, release = threading.Event(), threading.Event()
+
+        def slow_loader():
+            started.set()
+            release.wait(5)
+            return variants
+
+        slow = BasisSet.lazy('slow', slow_loader)
+        fast = BasisSet.lazy('fast', lambda: variants)
+
+        thread = threading.Thread(target=lambda: slow.data_objects)
+        thread.start()
+
+        try:
+            self.assertTrue(started.wait(5))
+
+            # the other family is loaded while the first one is still loading
+            self.assertEqual(str(fast), str(storage['SZV-MOLOPT-GTH']))
+            self.assertFalse(slow.is_loaded())
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertTrue(slow.is_loaded())
+
+    def test_with_text_ok(self):
+        """The rendered text and preferred names can be stored, then the numeric data are only read when needed"""
+
+        for storage_type in [BasisSetsStorage, PseudopotentialsStorage]:
+            with h5py.File(self.library_path) as f:
+                storage = storage_type.read_hdf5(f)
+
+            f = h5py.File(io.BytesIO(), 'w')
+            storage.dump_hdf5(f, with_text=True)
+
+            self.assertEqual(f[storage.name]['pool']['texts'].shape, f[storage.name]['pool']['symbols'].shape)
+            self.assertEqual(
+                f[storage.name]['families']['preferred_names'].shape, f[storage.name]['families']['variants'].shape)
+
+            for lazy in [False, True]:
+                with self.subTest(storage_type=storage_type, lazy=lazy):
+                    storage_read = storage_type.read_hdf5(f, lazy=lazy)
+
+                    for name in storage:
+                        for symbol in storage[name]:
+                            for variant in storage[name][symbol]:
+                                obj = storage_read[name][symbol][variant]
+                                self.assertEqual(str(obj), str(storage[name][symbol][variant]))
+                                self.assertEqual(
+                                    storage_read[name].preferred_name(symbol, variant),
+                                    storage[name][symbol][variant].preferred_name(name, variant)
+                                )
+
+                                # not unpacked ...
+                                self.assertIsNotNone(obj._loader)
+
+                    # ... until needed
+                    name = next(iter(storage))
+                    symbol = next(iter(storage[name]))
+                    variant = next(iter(storage[name][symbol]))
+
+                    obj = storage_read[name][symbol][variant]
+                    obj.text = None
+                    self.assertEqual(str(obj), str(storage[name][symbol][variant]))
+                    self.assertIsNone(obj._loader)
+
+        with self.assertRaises(ValueError):
+            BasisSetsStorage().dump_hdf5(h5py.File(io.BytesIO(), 'w'), format_version=1, with_text=True)
+
+    def test_unknown_format_version_ko(self):
+        f = h5py.File(io.BytesIO(), 'w')
+
+        with self.assertRaises(ValueError):
+            BasisSetsStorage().dump_hdf5(f, format_version=3)
+
+        storage = BasisSetsStorage()
+        storage.families['x'] = BasisSet('x', {'count': numpy.int64(2)})
+        storage.dump_hdf5(f)
+        self.assertEqual(BasisSetsStorage.read_hdf5(f)['x'].metadata, {'count': 2})
+
+        f[BasisSetsStorage.name].attrs['format_version'] = 3
+
+        with self.assertRaises(ValueError):
+            BasisSetsStorage.read_hdf5(f)
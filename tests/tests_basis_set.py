@@ -51,26 +51,29 @@ class BSTestCase(unittest.TestCase, BaseDataObjectMixin):
                 self.assertAtomicBasisSetEqual(bs1[symbol][variant], bs2[symbol][variant])
 
     def test_storage_dump_hdf5_ok(self):
-        path = tempfile.mktemp()
-
-        # write h5file
-        with h5py.File(path, 'w') as f:
-            self.storage.dump_hdf5(f)
-
-        # read back
-        with h5py.File(path) as f:
-            storage = BasisSetsStorage.read_hdf5(f)
-            self.assertEqual(len(list(self.storage)), len(list(storage)))
-
-            for bs_name in self.storage:
-                self.assertIn(bs_name, storage)
-                self.assertEqual(self.storage[bs_name].metadata, storage[bs_name].metadata)
-                self.assertEqual(len(list(self.storage[bs_name])), len(list(storage[bs_name])))
-
-                for symbol in self.storage[bs_name]:
-                    self.assertIn(symbol, self.storage[bs_name])
-                    self.assertEqual(len(list(self.storage[bs_name][symbol])), len(list(storage[bs_name][symbol])))
-
-                    for variant in self.storage[bs_name][symbol]:
-                        self.assertAtomicBasisSetEqual(
-                            storage[bs_name][symbol][variant], self.storage[bs_name][symbol][variant])
+        for format_version in [1, 2]:
+            with self.subTest(format_version=format_version):
+                path = tempfile.mktemp()
+
+                # write h5file
+                with h5py.File(path, 'w') as f:
+                    self.storage.dump_hdf5(f, format_version)
+
+                # read back
+                with h5py.File(path) as f:
+                    storage = BasisSetsStorage.read_hdf5(f)
+                    self.assertEqual(len(list(self.storage)), len(list(storage)))
+
+                    for bs_name in self.storage:
+                        self.assertIn(bs_name, storage)
+                        self.assertEqual(self.storage[bs_name].metadata, storage[bs_name].metadata)
+                        self.assertEqual(len(list(self.storage[bs_name])), len(list(storage[bs_name])))
+
+                        for symbol in self.storage[bs_name]:
+                            self.assertIn(symbol, self.storage[bs_name])
+                            self.assertEqual(
+                                len(list(self.storage[bs_name][symbol])), len(list(storage[bs_name][symbol])))
+
+                            for variant in self.storage[bs_name][symbol]:
+                                self.assertAtomicBasisSetEqual(
+                                    storage[bs_name][symbol][variant], self.storage[bs_name][symbol][variant])
@@ -0,0 +1,53 @@
+import unittest
+
+from benchmarks import rendering
+from benchmarks.ingestion import scale_content, run_benchmarks, compare, TESTS_DIR, BENCHMARKS
+from cp2k_basis.basis_set import AtomicBasisSetsParser
+
+
+class IngestionBenchmarkTestCase(unittest.TestCase):
+    def test_scale_content_ok(self):
+        content = (TESTS_DIR / 'BASIS_EXAMPLE').read_text()
+        objects = list(AtomicBasisSetsParser(content).iter_data_objects())
+
+        scaled_objects = list(AtomicBasisSetsParser(scale_content(content, 3)).iter_data_objects())
+        self.assertEqual(len(scaled_objects), 3 * len(objects))
+
+        # same data, new names
+        for i, obj in enumerate(objects):
+            self.assertEqual(scaled_objects[i].names, obj.names)
+            self.assertEqual(scaled_objects[2 * len(objects) + i].names, ['R2-{}'.format(n) for n in obj.names])
+            self.assertEqual(str(scaled_objects[len(objects) + i]).replace('R1-', ''), str(obj))
+
+    def test_run_and_compare_ok(self):
+        results = run_benchmarks(['POTENTIAL_MULTI_VARIANT'], [1, 2], repeat=1, out=None)
+        self.assertEqual(len(results), 2 * len(BENCHMARKS))
+
+        result = results['parse:POTENTIAL_MULTI_VARIANT:x2']
+        self.assertEqual(result['records'], 8)
+        self.assertGreater(result['records_per_s'], 0)
+        self.assertGreater(result['mb_per_s'], 0)
+
+        # no regression against itself
+        self.assertEqual(compare(results, results), [])
+
+        # ... but a (large) one against a faster baseline
+        baseline = {'parse:POTENTIAL_MULTI_VARIANT:x2': dict(result, time=result['time'] / 100 - 1)}
+        regressions = compare(results, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0][:2], ('parse:POTENTIAL_MULTI_VARIANT:x2', 'time'))
+
+
+class RenderingBenchmarkTestCase(unittest.TestCase):
+    def test_same_output_ok(self):
+        storages = rendering.read_storages()
+
+        # every variant of the library is rendered as before
+        self.assertEqual(rendering.mismatches(storages), [])
+
+    def test_run_ok(self):
+        results = rendering.run_benchmarks(repeat=1, out=None)
+
+        result = results['pseudopotentials:GTH-BLYP']
+        self.assertEqual(result['variants'], 10)
+        self.assertGreater(result['speedup'], 0)
@@ -0,0 +1,71 @@
+import unittest
+
+from cp2k_basis.cache import LRUCache
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_max_entries_ok(self):
+        evicted = []
+        cache = LRUCache(max_entries=2, on_evict=lambda k, v: evicted.append((k, v)))
+
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # `b` is now the least recently used
+
+        cache.put('c', 3)
+        self.assertEqual(evicted, [('b', 2)])
+        self.assertNotIn('b', cache)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], .5)
+
+    def test_max_bytes_ok(self):
+        cache = LRUCache(max_bytes=10)
+
+        cache.put('a', 1, 4)
+        cache.put('b', 2, 4)
+        self.assertEqual(cache.current_bytes, 8)
+
+        cache.put('c', 3, 4)
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache.current_bytes, 8)
+
+        # replace
+        cache.put('c', 4, 2)
+        self.assertEqual(cache.get('c'), 4)
+        self.assertEqual(cache.current_bytes, 6)
+
+        # an entry larger than the budget is kept anyway, but alone
+        cache.put('d', 5, 20)
+        self.assertEqual(list(cache.entries), ['d'])
+        self.assertEqual(cache.stats()['evictions'], 3)
+
+        # pop and clear are not evictions
+        self.assertEqual(cache.pop('d'), 5)
+        self.assertEqual(cache.current_bytes, 0)
+
+        cache.put('e', 6, 1)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['evictions'], 3)
+
+    def test_get_or_put_ok(self):
+        evicted = []
+        cache = LRUCache(max_entries=1, on_evict=lambda k, v: evicted.append((k, v)))
+
+        # added if not there ...
+        self.assertEqual(cache.get_or_put('a', 1, 4), 1)
+        self.assertEqual(cache.current_bytes, 4)
+
+        # ... otherwise, the existing value is kept
+        self.assertEqual(cache.get_or_put('a', 2, 8), 1)
+        self.assertEqual(cache.current_bytes, 4)
+
+        self.assertEqual(cache.get_or_put('b', 3), 3)
+        self.assertEqual(evicted, [('a', 1)])
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 2, 1))
@@ -53,3 +53,17 @@ class ElementSetTestCase(unittest.TestCase):
         eset = ElementSet.create('H-Ne')
         self.assertIn('O', eset)
         self.assertNotIn('Fe', eset)
+
+    def test_subset_element_set_ok(self):
+        eset = ElementSet.create('H-Ne')
+        self.assertTrue(ElementSet.create('C,O') <= eset)
+        self.assertTrue(ElementSet() <= eset)
+        self.assertFalse(ElementSet.create('C,Fe') <= eset)
+
+    def test_iter_element_set_ok(self):
+        eset = ElementSet.create('Fe,O,H,C')
+        self.assertEqual(eset.mask, (1 << 1) | (1 << 6) | (1 << 8) | (1 << 26))
+        self.assertEqual(len(eset), 4)
+        self.assertEqual(list(eset), ['H', 'C', 'O', 'Fe'])
+        self.assertEqual(str(eset), 'H,C,O,Fe')
+        self.assertEqual(ElementSet.from_mask(eset.mask), eset)
@@ -74,6 +74,31 @@ class FetchDataTestCase(unittest.TestCase, BaseDataObjectMixin):
 
         self.assertEqualToParsed(bs_storage, pp_storage, data_sources['metadata'])
 
+    def test_explore_file_lazy_ok(self):
+
+        with self.path_explore_source.open() as f:
+            data_sources = yaml.load(f, yaml.Loader)
+
+        pwd = pathlib.Path(self.path_explore_source).parent
+        bs_storage, pp_storage = explore_file(data_sources, pwd, lazy=True)
+
+        self.assertEqualToParsed(bs_storage, pp_storage, data_sources['metadata'])
+
+    def test_explore_file_in_parallel_ok(self):
+
+        with self.path_explore_source.open() as f:
+            data_sources = yaml.load(f, yaml.Loader)
+
+        pwd = pathlib.Path(self.path_explore_source).parent
+        bs_storage, pp_storage = explore_file(data_sources, pwd, jobs=2)
+
+        self.assertEqualToParsed(bs_storage, pp_storage, data_sources['metadata'])
+        self.assertEqual(list(bs_storage), list(self.bs_storage_parsed))
+
+        # not both
+        with self.assertRaises(ValueError):
+            explore_file(data_sources, pwd, jobs=2, lazy=True)
+
     @unittest.skipUnless(os.environ.get('TEST_FETCH_DATA'), '`TEST_FETCH_DATA` is not set')
     def test_fetch_data_ok(self):
         # NOTE: this test will fail if the `BASIS_EXAMPLE` or `POTENTIAL_EXAMPLE` files are changed locally.
@@ -0,0 +1,68 @@
+import pathlib
+import unittest
+
+import h5py
+
+from cp2k_basis.basis_set import BasisSetsStorage
+from cp2k_basis.elements import ElementSet, SYMB_TO_Z
+from cp2k_basis.pseudopotential import PseudopotentialsStorage
+
+
+class FamiliesIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        with h5py.File(pathlib.Path(__file__).parent / 'LIBRARY_EXAMPLE.h5') as f:
+            self.storages = [BasisSetsStorage.read_hdf5(f), PseudopotentialsStorage.read_hdf5(f)]
+
+    @staticmethod
+    def _get_names(storage, elements: ElementSet = None, search_name: str = '', search_tags: str = ''):
+        """Same search, without the index"""
+
+        names = []
+        for name in storage:
+            if search_tags and search_tags not in storage.tags_per_family.get(name, []):
+                continue
+            if search_name and search_name.lower() not in name.lower():
+                continue
+            if elements and not elements <= ElementSet(SYMB_TO_Z[s] for s in storage.elements_per_family[name]):
+                continue
+
+            names.append(name)
+
+        return names
+
+    def test_search_ok(self):
+        queries = [
+            dict(),
+            dict(elements=ElementSet.create('H')),
+            dict(elements=ElementSet.create('C,O')),
+            dict(elements=ElementSet.create('O,Ne')),
+            dict(elements=ElementSet.create('Lr')),
+            dict(search_name='molopt'),
+            dict(search_name='MOLOPT-GTH'),
+            dict(search_name='q'),
+            dict(search_name='TZ'),
+            dict(search_name='xyz'),
+            dict(search_tags='MOLOPT'),
+            dict(search_tags='GTH'),
+            dict(search_tags='unknown'),
+            dict(elements=ElementSet.create('C'), search_name='tzv', search_tags='GTH'),
+        ]
+
+        for storage in self.storages:
+            self.assertIsNotNone(storage.index)
+
+            for query in queries:
+                with self.subTest(storage=storage.name, **query):
+                    self.assertEqual(storage.get_names(**query), self._get_names(storage, **query))
+
+    def test_update_reset_index_ok(self):
+        storage = BasisSetsStorage()
+        self.assertEqual(storage.get_names(ElementSet.create('C')), [])
+
+        for name in self.storages[0]:
+            for symbol in self.storages[0][name]:
+                for variant in self.storages[0][name][symbol]:
+                    storage._update(self.storages[0][name][symbol][variant], name, variant)
+
+        self.assertIsNone(storage.index)
+        self.assertEqual(storage.get_names(ElementSet.create('C')), self._get_names(storage, ElementSet.create('C')))
@@ -1,10 +1,16 @@
+import functools
+import io
+import mmap
 import pathlib
+import re
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy
 
 from cp2k_basis.basis_set import AtomicBasisSetsParser
-from cp2k_basis.parser import Lexer, Token as TK, TokenType as TT, BaseParser, ParserSyntaxError
+from cp2k_basis.parser import Lexer, RegexLexer, Token as TK, TokenType as TT, BaseParser, ParserSyntaxError, \
+    index_records
 from cp2k_basis.pseudopotential import AtomicPseudopotentialsParser
 from tests import BaseDataObjectMixin
 
@@ -28,6 +34,55 @@ class LexerTestCase(unittest.TestCase):
             self.assertEqual(token.type, expected[i].type)
             self.assertEqual(token.value, expected[i].value)
 
+    def assertSameTokens(self, inp: str):
+        tokens = list((t.type, t.value, t.position, t.line) for t in Lexer(inp).tokenize())
+        regex_tokens = list((t.type, t.value, t.position, t.line) for t in RegexLexer(inp).tokenize())
+
+        self.assertEqual(tokens, regex_tokens)
+
+        # chunks, from a stream
+        for chunk_size in [1, 3, 64]:
+            regex_tokens = list(
+                (t.type, t.value, t.position, t.line) for t in RegexLexer(io.StringIO(inp), chunk_size).tokenize())
+
+            self.assertEqual(tokens, regex_tokens)
+
+    def test_regex_lexer_same_tokens_ok(self):
+        for inp in ['', ' ', '\n', 'ceci est\nun test ', ' \t a\r\n\n  b \n\t\n', '# comment\n\n42  1.5\tU\n']:
+            self.assertSameTokens(inp)
+
+        for path in ['BASIS_EXAMPLE', 'POTENTIALS_EXAMPLE', 'POTENTIAL_MULTI_VARIANT', 'POTENTIAL_ALL_EXAMPLE']:
+            with (pathlib.Path(__file__).parent / path).open() as f:
+                self.assertSameTokens(f.read())
+
+    def test_regex_lexer_binary_ok(self):
+        path = pathlib.Path(__file__).parent / 'BASIS_EXAMPLE'
+        tokens = list((t.type, t.value, t.position, t.line) for t in Lexer(path.read_text()).tokenize())
+
+        # bytes
+        self.assertEqual(tokens, list(
+            (t.type, t.value, t.position, t.line) for t in RegexLexer(path.read_bytes(), 5).tokenize()))
+
+        # memory-mapped file
+        with path.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            self.assertEqual(tokens, list((t.type, t.value, t.position, t.line) for t in RegexLexer(m).tokenize()))
+
+        # multibyte character split between two chunks
+        self.assertEqual(['é', 'à'], list(t.value for t in RegexLexer('é à'.encode(), 1).tokenize())[::2][:2])
+
+    def test_regex_lexer_readline_ok(self):
+        lexer = RegexLexer(io.StringIO('a b\n\nc d\ne'), 2)
+        tokenizer = lexer.tokenize()
+
+        self.assertEqual(next(tokenizer).value, 'a')
+        self.assertEqual(lexer.readline(), ' b\n')
+        self.assertEqual(lexer.readline(), '\n')
+        self.assertEqual(lexer.readline(), 'c d\n')
+
+        token = next(tokenizer)
+        self.assertEqual((token.value, token.position, token.line), ('e', 9, 4))
+        self.assertEqual(lexer.readline(), '')
+
 
 class BaseParserTestCase(unittest.TestCase):
     def test_numbers_ok(self):
@@ -64,6 +119,71 @@ class BaseParserTestCase(unittest.TestCase):
         with self.assertRaises(ParserSyntaxError):  # too long
             BaseParser('42 a').line('iww')
 
+    def test_numbers_block_ok(self):
+        parser = BaseParser('1.5 2 3\n# comment\n\n  4 5e-1 -6\n7')
+        self.assertTrue(numpy.array_equal(parser.numbers_block([3, 3]), [1.5, 2, 3, 4, .5, -6]))
+        self.assertEqual(parser.integer(), 7)
+
+        # triangular block, starting within a line
+        parser = BaseParser('1 2 3\n  4')
+        self.assertEqual(parser.integer(), 1)
+        parser.eat(TT.SPACE)
+        self.assertTrue(numpy.array_equal(parser.numbers_block([2, 1]), [2, 3, 4]))
+        self.assertEqual(parser.current_token.type, TT.EOS)
+
+        # extra stuffs
+        parser = BaseParser('1 2 U\n3 4 O\n5')
+        self.assertTrue(numpy.array_equal(parser.numbers_block([2, 2], skip_extra=True), [1, 2, 3, 4]))
+        self.assertEqual(parser.current_token.line, 3)
+
+    def test_numbers_block_ko(self):
+        with self.assertRaises(ParserSyntaxError):  # too short
+            BaseParser('1 2\n3').numbers_block([2, 2])
+
+        with self.assertRaises(ParserSyntaxError):  # too long
+            BaseParser('1 2 3\n3 4').numbers_block([2, 2])
+
+        with self.assertRaises(ParserSyntaxError):  # not numbers
+            BaseParser('1 a').numbers_block([2])
+
+        with self.assertRaises(ParserSyntaxError):  # missing lines
+            BaseParser('1 2\n\n').numbers_block([2, 2])
+
+        # bad value in the first row, reported with its position and line
+        with self.assertRaisesRegex(ParserSyntaxError, 'got {}$'.format(re.escape(repr(TK(TT.WORD, 'a', 2, 1))))):
+            BaseParser('1 a\n3 4').numbers_block([2, 2])
+
+        with self.assertRaisesRegex(ParserSyntaxError, 'got {}$'.format(re.escape(repr(TK(TT.WORD, 'x', 23, 4))))):
+            AtomicBasisSetsParser('H SZV\n1\n1 0 0 3 1\n 1.0 x\n 2.0 0.3\n 3.0 0.1\n').atomic_basis_set_variant()
+
+
+class RecordsTestCase(unittest.TestCase, BaseDataObjectMixin):
+    def test_index_records_ok(self):
+        inp = '# H comment\nH  A B\n 1\n 1 0 0 1 1\n 1.0 1.0\n\n  He  C\n    NA\nC D'
+        records = index_records(inp)
+
+        self.assertEqual(records, [(12, 2), (inp.index('  He'), 7), (inp.index('C D'), 9)])
+
+    def test_parse_in_parallel_ok(self):
+        path_bs = pathlib.Path(__file__).parent / 'BASIS_EXAMPLE'
+        path_pp = pathlib.Path(__file__).parent / 'POTENTIALS_EXAMPLE'
+
+        with ProcessPoolExecutor(2) as executor:
+            for path, parser_type, assert_equal in [
+                (path_bs, AtomicBasisSetsParser, self.assertAtomicBasisSetEqual),
+                (path_pp, AtomicPseudopotentialsParser, self.assertAtomicPseudoEqual)
+            ]:
+                inp = path.read_text()
+                objects = list(parser_type(inp, source='x').iter_data_objects())
+                objects_in_parallel = list(
+                    parser_type.iter_data_objects_in_parallel(inp, executor, source='x', records_per_task=3))
+
+                self.assertEqual(len(objects), len(objects_in_parallel))
+
+                for obj1, obj2 in zip(objects, objects_in_parallel):
+                    assert_equal(obj1, obj2)
+                    self.assertEqual(obj1.source, obj2.source)
+
 
 SINGLE_ABS = """{symbol} {names}
 1
@@ -112,6 +232,44 @@ class BSParserTestCase(unittest.TestCase, BaseDataObjectMixin):
         self.assertTrue(numpy.array_equal(contraction.exponents, coefs[:, 0]))
         self.assertTrue(numpy.array_equal(contraction.coefficients.T[0], coefs[:, 1]))
 
+    def test_parse_atomic_basis_set_extra_columns_ok(self):
+        abs_ = AtomicBasisSetsParser(
+            'H SZV\n1\n1 0 0 2 1 U\n 2.0 0.5 O\n# comment\n 1.0 0.25 O\n').atomic_basis_set_variant()
+
+        contraction = abs_.contractions[0]
+        self.assertTrue(numpy.array_equal(contraction.exponents, [2.0, 1.0]))
+        self.assertTrue(numpy.array_equal(contraction.coefficients, [[.5], [.25]]))
+
+    def test_parse_basis_sets_from_stream_ok(self):
+        path = pathlib.Path(__file__).parent / 'BASIS_EXAMPLE'
+        variants = list(AtomicBasisSetsParser(path.read_text(), source='x').iter_atomic_basis_set_variants())
+
+        class SmallChunksParser(AtomicBasisSetsParser):
+            lexer_type = functools.partial(RegexLexer, chunk_size=7)
+
+        with path.open() as f:
+            variants_from_stream = list(SmallChunksParser(f, source='x').iter_atomic_basis_set_variants())
+
+        self.assertEqual(len(variants), len(variants_from_stream))
+
+        for abs1, abs2 in zip(variants, variants_from_stream):
+            self.assertAtomicBasisSetEqual(abs1, abs2)
+            self.assertEqual(abs1.source, abs2.source)
+
+    def test_parse_basis_sets_lazy_ok(self):
+        path = pathlib.Path(__file__).parent / 'BASIS_EXAMPLE'
+        variants = list(AtomicBasisSetsParser(path.read_text(), source='x').iter_atomic_basis_set_variants())
+
+        for inp in [path.read_text(), io.StringIO(path.read_text())]:
+            lazy_variants = list(AtomicBasisSetsParser(inp, source='x').iter_atomic_basis_set_variants(lazy=True))
+            self.assertEqual(len(variants), len(lazy_variants))
+
+            for abs1, abs2 in zip(variants, lazy_variants):
+                self.assertNotIn('contractions', abs2.__dict__)  # not loaded yet
+                self.assertEqual(abs1.source, abs2.source)
+                self.assertAtomicBasisSetEqual(abs1, abs2)
+                self.assertIn('contractions', abs2.__dict__)
+
     def test_parse_basis_sets_ok(self):
         storage = self.read_basis_set_from_file(pathlib.Path(__file__).parent / 'BASIS_EXAMPLE')
 
@@ -191,6 +349,34 @@ class PPParserTestCase(unittest.TestCase, BaseDataObjectMixin):
             self.assertEqual(proj.radius, nlradius[i])
             self.assertTrue(numpy.array_equal(proj.coefficients, nlprojectors[i]))
 
+    def test_parse_pp_lazy_ok(self):
+        path = pathlib.Path(__file__).parent / 'POTENTIAL_MULTI_VARIANT'
+        pps = list(AtomicPseudopotentialsParser(path.read_text()).iter_atomic_pseudopotential_variants())
+        lazy_pps = list(AtomicPseudopotentialsParser(path.read_text()).iter_atomic_pseudopotential_variants(lazy=True))
+
+        self.assertEqual(len(pps), len(lazy_pps))
+
+        for app1, app2 in zip(pps, lazy_pps):
+            self.assertEqual(app1.nelec, app2.nelec)
+            self.assertNotIn('nlprojectors', app2.__dict__)  # not loaded yet
+            self.assertAtomicPseudoEqual(app1, app2)
+
+        # not available
+        inp = 'H GTH-BLYP-q1\n NA\nHe GTH-BLYP-q2\n 2\n 0.2 0\n 0'
+        self.assertEqual(
+            ['He'], list(app.symbol for app in AtomicPseudopotentialsParser(inp).iter_atomic_pseudopotential_variants(
+                lazy=True)))
+
+    def test_parse_pp_lazy_ko(self):
+        # the electrons per shell are checked, as when not lazy
+        for nelec in ['x', '1 x', '1 2x', '1 0 # comment']:
+            inp = 'H GTH-BLYP-q1\n {}\n 0.2 0\n 0'.format(nelec)
+
+            for lazy in [False, True]:
+                with self.subTest(nelec=nelec, lazy=lazy):
+                    with self.assertRaises(ParserSyntaxError):
+                        list(AtomicPseudopotentialsParser(inp).iter_atomic_pseudopotential_variants(lazy=lazy))
+
     def test_parse_pp_ok(self):
         storage = self.read_pp_from_file(pathlib.Path(__file__).parent / 'POTENTIALS_EXAMPLE')
 
@@ -85,34 +85,37 @@ class PseudoTestCase(unittest.TestCase, BaseDataObjectMixin):
         self.assertIn('q2', storage[name]['He'])
 
     def test_storage_dump_hdf5_ok(self):
-        path = tempfile.mktemp()
-
-        # write h5file
-        with h5py.File(path, 'w') as f:
-            self.storage.dump_hdf5(f)
-
-        # read back
-        with h5py.File(path) as f:
-            storage = PseudopotentialsStorage.read_hdf5(f)
-            self.assertEqual(len(list(self.storage)), len(list(storage)))
-
-            for pp_name in self.storage:
-                self.assertIn(pp_name, storage)
-                self.assertEqual(self.storage[pp_name].metadata, storage[pp_name].metadata)
-                self.assertEqual(len(list(self.storage[pp_name])), len(list(storage[pp_name])))
-
-                for symbol in self.storage[pp_name]:
-                    self.assertIn(symbol, storage[pp_name])
-                    self.assertEqual(len(list(self.storage[pp_name][symbol])), len(list(storage[pp_name][symbol])))
-
-                    for variant in self.storage[pp_name][symbol]:
-                        self.assertAtomicPseudoEqual(
-                            storage[pp_name][symbol][variant], self.storage[pp_name][symbol][variant])
-
-                        self.assertEqual(
-                            'q{}'.format(sum(storage[pp_name][symbol][variant].nelec)),
-                            variant
-                        )
+        for format_version in [1, 2]:
+            with self.subTest(format_version=format_version):
+                path = tempfile.mktemp()
+
+                # write h5file
+                with h5py.File(path, 'w') as f:
+                    self.storage.dump_hdf5(f, format_version)
+
+                # read back
+                with h5py.File(path) as f:
+                    storage = PseudopotentialsStorage.read_hdf5(f)
+                    self.assertEqual(len(list(self.storage)), len(list(storage)))
+
+                    for pp_name in self.storage:
+                        self.assertIn(pp_name, storage)
+                        self.assertEqual(self.storage[pp_name].metadata, storage[pp_name].metadata)
+                        self.assertEqual(len(list(self.storage[pp_name])), len(list(storage[pp_name])))
+
+                        for symbol in self.storage[pp_name]:
+                            self.assertIn(symbol, storage[pp_name])
+                            self.assertEqual(
+                                len(list(self.storage[pp_name][symbol])), len(list(storage[pp_name][symbol])))
+
+                            for variant in self.storage[pp_name][symbol]:
+                                self.assertAtomicPseudoEqual(
+                                    storage[pp_name][symbol][variant], self.storage[pp_name][symbol][variant])
+
+                                self.assertEqual(
+                                    'q{}'.format(sum(storage[pp_name][symbol][variant].nelec)),
+                                    variant
+                                )
 
     def test_preferred_name_ok(self):
         app1 = self.storage['GTH-BLYP']['Ne']['q8']